@@ -1,3 +1,6 @@
+import argparse
+import os
+
 import pandas as pd
 from ast import literal_eval
 
@@ -5,27 +8,46 @@ from cdqa.utils.filters import filter_paragraphs
 from cdqa.utils.download import download_model, download_bnpp_data
 from cdqa.pipeline.cdqa_sklearn import QAPipeline
 
+from index import INDEX_DIR, ReaderLoader, fit_or_load
+
+READER = 'models/bert_qa.joblib'
+RETRIEVER_PARAMS = {'min_df': 1, 'max_df': 1000}
+
+parser = argparse.ArgumentParser(description='Answer questions about a corpus')
+parser.add_argument('--corpus', help='CSV of titles and paragraphs, e.g. data/my_data/homework.csv; asks for text if not given')
+parser.add_argument('--index-dir', default=INDEX_DIR)
+args = parser.parse_args()
+
 # Download data and models
 #download_bnpp_data(dir='./data/bnpp_newsroom_v1.1/')
 
-if input('Download model? Only do if you haven\'t already.').lower().startswith('y'):
+if not os.path.exists(READER) and input('Download model? Only do if you haven\'t already.').lower().startswith('y'):
     download_model(model='bert-squad_1.1', dir='./models')
 
-#df = pd.read_csv('data/my_data/homework.csv', converters={'paragraphs': literal_eval})
-#df = filter_paragraphs(df)
+# The reader loads in the background while the retriever is set up
+reader = ReaderLoader(READER)
 
-df = pd.DataFrame(columns=['title', 'paragraphs'])
-paragraphs = input("Text to Analyze:\n").split('\n')
-df = df.append({'title': 'Inputed Data', 'paragraphs': paragraphs}, ignore_index=True)
+if args.corpus:
+    df = pd.read_csv(args.corpus, converters={'paragraphs': literal_eval})
+    df = filter_paragraphs(df)
+else:
+    df = pd.DataFrame(columns=['title', 'paragraphs'])
+    paragraphs = input("Text to Analyze:\n").split('\n')
+    df = df.append({'title': 'Inputed Data', 'paragraphs': paragraphs}, ignore_index=True)
 
 print(df)
 
-cdqa_pipeline = QAPipeline(reader='models/bert_qa.joblib', min_df=1, max_df=1000)
+# An untrained placeholder reader is cheap to build; the loaded one replaces
+# it before the first prediction
+cdqa_pipeline = QAPipeline(**RETRIEVER_PARAMS)
 
-cdqa_pipeline.fit_retriever(df=df)
+# Refits only when the corpus or the retriever settings changed
+fit_or_load(cdqa_pipeline, df, args.index_dir, **RETRIEVER_PARAMS)
 
 while True:
     query = input('> ')
+    if cdqa_pipeline.reader is not reader.reader:
+        cdqa_pipeline.reader = reader.get()
     prediction = cdqa_pipeline.predict(query=query)
 
     #if prediction[3] < -2:
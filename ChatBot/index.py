@@ -0,0 +1,77 @@
+# The fitted retriever and document store of a QAPipeline, saved once per
+# corpus. A corpus is identified by a hash of its paragraphs and the
+# retriever settings, so the saved index is only rebuilt when either changes.
+# Numpy arrays in the saved index are memory-mapped when it is loaded.
+import hashlib
+import json
+import os
+import threading
+
+import joblib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(HERE, "cache")
+
+
+def corpus_hash(df, **retriever_params):
+    digest = hashlib.sha256()
+    for title, paragraphs in zip(df["title"], df["paragraphs"]):
+        digest.update(json.dumps([title, list(paragraphs)]).encode())
+    digest.update(json.dumps(retriever_params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def index_path(key, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f"retriever-{key[:16]}.joblib")
+
+
+def save_index(pipeline, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written beside the final name and renamed, so a process starting up
+    # never loads half an index
+    tmp_path = path + ".tmp"
+    joblib.dump(
+        {"retriever": pipeline.retriever, "metadata": pipeline.metadata},
+        tmp_path,
+    )
+    os.replace(tmp_path, path)
+
+
+def load_index(pipeline, path):
+    index = joblib.load(path, mmap_mode="r")
+    pipeline.retriever = index["retriever"]
+    pipeline.metadata = index["metadata"]
+
+
+def fit_or_load(pipeline, df, index_dir=INDEX_DIR, **retriever_params):
+    # Returns True when the index was loaded instead of fitted
+    path = index_path(corpus_hash(df, **retriever_params), index_dir)
+    if os.path.exists(path):
+        load_index(pipeline, path)
+        return True
+    pipeline.fit_retriever(df=df)
+    save_index(pipeline, path)
+    return False
+
+
+class ReaderLoader:
+    # Loads the reader model in a background thread, so it can be done
+    # while the index loads and the first question is typed
+    def __init__(self, path):
+        self.reader = None
+        self.error = None
+        self.thread = threading.Thread(target=self.load, args=(path,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def load(self, path):
+        try:
+            self.reader = joblib.load(path)
+        except Exception as e:
+            self.error = e
+
+    def get(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.reader
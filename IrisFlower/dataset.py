@@ -0,0 +1,94 @@
+# The iris dataset as float32 features and integer-coded labels. A CSV is
+# parsed once and converted into .npy files plus a small JSON header; later
+# loads map the arrays straight from disk without touching the CSV again.
+import hashlib
+import json
+import os
+
+import numpy as np
+from pandas import Categorical, read_csv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUNDLED = os.path.join(HERE, "data", "iris.csv")
+DATA_CACHE_DIR = os.path.join(HERE, "cache", "data")
+NAMES = ["sepal-length", "sepal-width", "petal-length", "petal-width", "class"]
+FEATURES = NAMES[:-1]
+LABEL = NAMES[-1]
+
+FEATURES_FILE = "features.npy"
+LABELS_FILE = "labels.npy"
+HEADER_FILE = "header.json"
+
+
+def write_atomic(path, write, mode="wb"):
+    # Readers never see a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def source_stamp(path):
+    # Changes whenever the CSV is replaced or edited
+    stat = os.stat(path)
+    return {
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def converted_dir(path, cache_dir):
+    name = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, name)
+
+
+def read_header(out_dir):
+    path = os.path.join(out_dir, HEADER_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def convert(path, out_dir):
+    dataset = read_csv(path, names=NAMES)
+    features = dataset[FEATURES].to_numpy(dtype=np.float32)
+    labels = Categorical(dataset[LABEL])
+    codes = np.asarray(labels.codes, dtype=np.int8)
+
+    os.makedirs(out_dir, exist_ok=True)
+    write_atomic(
+        os.path.join(out_dir, FEATURES_FILE), lambda f: np.save(f, features)
+    )
+    write_atomic(
+        os.path.join(out_dir, LABELS_FILE), lambda f: np.save(f, codes)
+    )
+    # The header goes last: it is what marks the conversion as complete
+    header = {
+        "source": source_stamp(path),
+        "features": FEATURES,
+        "classes": [str(name) for name in labels.categories],
+        "rows": len(dataset),
+    }
+    write_atomic(
+        os.path.join(out_dir, HEADER_FILE),
+        lambda f: json.dump(header, f),
+        mode="w",
+    )
+    return header
+
+
+def load_dataset(path=None, cache_dir=DATA_CACHE_DIR, mmap_mode="r"):
+    # Returns (X, y, classes): X is float32 of shape (rows, 4), y holds
+    # indexes into classes. `path` defaults to the bundled copy.
+    if path is None:
+        path = BUNDLED
+    out_dir = converted_dir(path, cache_dir)
+    header = read_header(out_dir)
+    if header is None or header["source"] != source_stamp(path):
+        header = convert(path, out_dir)
+
+    X = np.load(os.path.join(out_dir, FEATURES_FILE), mmap_mode=mmap_mode)
+    y = np.load(os.path.join(out_dir, LABELS_FILE), mmap_mode=mmap_mode)
+    return X, y, header["classes"]
@@ -1,10 +1,7 @@
 # Load libraries
-from pandas import read_csv
 from pandas.plotting import scatter_matrix
 from matplotlib import pyplot
 from sklearn.model_selection import train_test_split
-from sklearn.model_selection import cross_val_score
-from sklearn.model_selection import StratifiedKFold
 from sklearn.metrics import classification_report
 from sklearn.metrics import confusion_matrix
 from sklearn.metrics import accuracy_score
@@ -15,32 +12,55 @@ from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
 from sklearn.naive_bayes import GaussianNB
 from sklearn.svm import SVC
 
-# Load dataset
-url = "https://raw.githubusercontent.com/jbrownlee/Datasets/master/iris.csv"
-names = ['sepal-length', 'sepal-width', 'petal-length', 'petal-width', 'class']
-dataset = read_csv(url, names=names)
-
-# Split-out validation dataset
-array = dataset.values
-X = array[:,0:4]
-y = array[:,4]
-X_train, X_validation, Y_train, Y_validation = train_test_split(X, y, test_size=0.20, random_state=1)
-
-# Spot Check Algorithms
-models = []
-models.append(('LR', LogisticRegression(solver='liblinear', multi_class='ovr')))
-models.append(('LDA', LinearDiscriminantAnalysis()))
-models.append(('KNN', KNeighborsClassifier()))
-models.append(('CART', DecisionTreeClassifier()))
-models.append(('NB', GaussianNB()))
-models.append(('SVM', SVC(gamma='auto')))
-
-# evaluate each model in turn
-results = []
-model_names = []
-for name, model in models:
-    kfold = StratifiedKFold(n_splits=10, random_state=1, shuffle=True)
-    cv_results = cross_val_score(model, X_train, Y_train, cv=kfold, scoring='accuracy')
-    results.append(cv_results)
-    model_names.append(name)
-    print('%s: %f (%f)' % (name, cv_results.mean(), cv_results.std()))
+from dataset import DATA_CACHE_DIR, load_dataset
+from spotcheck import CACHE_DIR, spot_check
+
+
+def spot_check_models():
+    models = []
+    models.append(('LR', LogisticRegression(solver='liblinear', multi_class='ovr')))
+    models.append(('LDA', LinearDiscriminantAnalysis()))
+    models.append(('KNN', KNeighborsClassifier()))
+    models.append(('CART', DecisionTreeClassifier()))
+    models.append(('NB', GaussianNB()))
+    models.append(('SVM', SVC(gamma='auto')))
+    return models
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Spot-check models on the iris dataset"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=-1, help="worker processes, -1 for one per core"
+    )
+    parser.add_argument(
+        "--data", help="iris CSV to load instead of the bundled data/iris.csv"
+    )
+    parser.add_argument("--data-cache-dir", default=DATA_CACHE_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    # Load dataset, parsing the CSV only the first time
+    X, y, classes = load_dataset(args.data, cache_dir=args.data_cache_dir)
+
+    # Split-out validation dataset
+    X_train, X_validation, Y_train, Y_validation = train_test_split(X, y, test_size=0.20, random_state=1)
+
+    # Spot Check Algorithms, every (model, fold) pair in parallel
+    results = spot_check(
+        spot_check_models(),
+        X_train,
+        Y_train,
+        n_jobs=args.jobs,
+        cache_dir=None if args.no_cache else args.cache_dir,
+    )
+    for name, cv_results in results.items():
+        print('%s: %f (%f)' % (name, cv_results.mean(), cv_results.std()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# Fits one of the spot-check models, saves it, and scores large feature files
+# with it in fixed-size chunks.
+#
+#   python predict.py fit LR --out models/lr
+#   python predict.py predict models/lr features.csv --out predictions.csv
+#
+# LR, LDA and NB are saved as their fitted arrays in an .npz beside a JSON
+# header and predict with plain numpy; other models are saved with joblib.
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from pandas import DataFrame, read_csv
+
+from dataset import DATA_CACHE_DIR, FEATURES, load_dataset, write_atomic
+
+HEADER_EXT = ".json"
+ARRAYS_EXT = ".npz"
+JOBLIB_EXT = ".joblib"
+CHUNK_ROWS = 100000
+
+
+class LinearModel:
+    # LogisticRegression (one-vs-rest) and LinearDiscriminantAnalysis both
+    # predict the class with the highest X @ coef.T + intercept
+    kind = "linear"
+
+    def __init__(self, coef, intercept, classes):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = np.asarray(classes)
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        return cls(estimator.coef_, estimator.intercept_, estimator.classes_)
+
+    def arrays(self):
+        return {
+            "coef": self.coef,
+            "intercept": self.intercept,
+            "classes": self.classes,
+        }
+
+    def predict(self, X):
+        scores = X @ self.coef.T + self.intercept
+        if scores.shape[1] == 1:
+            # Two classes share one decision function
+            return self.classes[(scores[:, 0] > 0).astype(np.intp)]
+        return self.classes[scores.argmax(axis=1)]
+
+
+class GaussianNBModel:
+    kind = "gaussian_nb"
+
+    def __init__(self, theta, var, class_prior, classes):
+        self.theta = np.asarray(theta, dtype=np.float64)
+        self.var = np.asarray(var, dtype=np.float64)
+        self.class_prior = np.asarray(class_prior, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        # Everything in the log likelihood that does not depend on X
+        self.offset = np.log(self.class_prior) - 0.5 * np.log(
+            2 * np.pi * self.var
+        ).sum(axis=1)
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        # sklearn before 1.0 calls var_ sigma_
+        var = getattr(estimator, "var_", None)
+        if var is None:
+            var = estimator.sigma_
+        return cls(
+            estimator.theta_, var, estimator.class_prior_, estimator.classes_
+        )
+
+    def arrays(self):
+        return {
+            "theta": self.theta,
+            "var": self.var,
+            "class_prior": self.class_prior,
+            "classes": self.classes,
+        }
+
+    def predict(self, X):
+        diff = X[:, None, :] - self.theta[None, :, :]
+        log_likelihood = self.offset - 0.5 * (diff**2 / self.var).sum(axis=2)
+        return self.classes[log_likelihood.argmax(axis=1)]
+
+
+COMPACT = {
+    "LogisticRegression": LinearModel,
+    "LinearDiscriminantAnalysis": LinearModel,
+    "GaussianNB": GaussianNBModel,
+}
+KINDS = {cls.kind: cls for cls in COMPACT.values()}
+
+
+def save_model(estimator, path, classes):
+    # `classes` names the label codes the estimator was fitted on
+    base = os.path.splitext(path)[0]
+    os.makedirs(os.path.dirname(os.path.abspath(base)), exist_ok=True)
+    compact = COMPACT.get(type(estimator).__name__)
+    header = {
+        "estimator": type(estimator).__name__,
+        "features": FEATURES,
+        "classes": list(classes),
+    }
+    if compact is None:
+        import joblib
+
+        header["kind"] = "joblib"
+        write_atomic(base + JOBLIB_EXT, lambda f: joblib.dump(estimator, f))
+    else:
+        model = compact.from_estimator(estimator)
+        header["kind"] = model.kind
+        write_atomic(
+            base + ARRAYS_EXT, lambda f: np.savez(f, **model.arrays())
+        )
+    write_atomic(base + HEADER_EXT, lambda f: json.dump(header, f), mode="w")
+    return header
+
+
+def load_model(path):
+    # Returns (model, header); model.predict gives label codes
+    base = os.path.splitext(path)[0]
+    with open(base + HEADER_EXT) as f:
+        header = json.load(f)
+    if header["kind"] == "joblib":
+        import joblib
+
+        return joblib.load(base + JOBLIB_EXT), header
+    with np.load(base + ARRAYS_EXT) as arrays:
+        return KINDS[header["kind"]](**arrays), header
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    # float32 feature chunks from a .npy file or a headerless CSV whose
+    # first columns are the features, as in data/iris.csv
+    if path.endswith(".npy"):
+        features = np.load(path, mmap_mode="r")
+        for start in range(0, len(features), chunk_rows):
+            yield np.asarray(
+                features[start : start + chunk_rows], dtype=np.float32
+            )
+        return
+    for chunk in read_csv(
+        path,
+        header=None,
+        usecols=range(len(FEATURES)),
+        dtype=np.float32,
+        chunksize=chunk_rows,
+    ):
+        yield chunk.to_numpy()
+
+
+def predict_file(model, classes, path, out, chunk_rows=CHUNK_ROWS):
+    # Writes one class name per row to `out` and returns (rows, seconds).
+    # Only one chunk is held in memory at a time.
+    classes = np.asarray(classes)
+    rows = 0
+    start = time.perf_counter()
+    for chunk in read_chunks(path, chunk_rows):
+        labels = classes[np.asarray(model.predict(chunk), dtype=np.intp)]
+        DataFrame({"class": labels}).to_csv(out, header=False, index=False)
+        rows += len(chunk)
+    return rows, time.perf_counter() - start
+
+
+def fit(name, params=None, data=None, data_cache_dir=DATA_CACHE_DIR):
+    # Fits the named spot-check model on main.py's training split and
+    # returns (estimator, validation accuracy, classes)
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+
+    from main import spot_check_models
+
+    X, y, classes = load_dataset(data, cache_dir=data_cache_dir)
+    X_train, X_validation, Y_train, Y_validation = train_test_split(
+        X, y, test_size=0.20, random_state=1
+    )
+    estimator = dict(spot_check_models())[name]
+    if params:
+        estimator.set_params(**params)
+    estimator.fit(X_train, Y_train)
+    accuracy = accuracy_score(Y_validation, estimator.predict(X_validation))
+    return estimator, accuracy, classes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fit and save an iris classifier or score a file with one"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = commands.add_parser("fit", help="fit and save a model")
+    fit_parser.add_argument("model", help="spot-check model name, e.g. LR")
+    fit_parser.add_argument("--out", required=True)
+    fit_parser.add_argument(
+        "--params", type=json.loads, help="JSON settings, e.g. from search.py"
+    )
+    fit_parser.add_argument("--data")
+    fit_parser.add_argument("--data-cache-dir", default=DATA_CACHE_DIR)
+
+    predict_parser = commands.add_parser(
+        "predict", help="score a .npy or CSV feature file"
+    )
+    predict_parser.add_argument("model", help="path given to fit --out")
+    predict_parser.add_argument("features")
+    predict_parser.add_argument(
+        "--out", help="file for the predicted classes, default stdout"
+    )
+    predict_parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.command == "fit":
+        estimator, accuracy, classes = fit(
+            args.model, args.params, args.data, args.data_cache_dir
+        )
+        header = save_model(estimator, args.out, classes)
+        print(f"{args.model}: validation accuracy {accuracy:f}")
+        print(f"saved {header['kind']} model to {args.out}")
+    else:
+        model, header = load_model(args.model)
+        out = sys.stdout if args.out is None else open(args.out, "w")
+        with out:
+            rows, seconds = predict_file(
+                model, header["classes"], args.features, out, args.chunk_rows
+            )
+        print(
+            f"{rows} rows in {seconds:.2f}s"
+            f" ({rows / seconds if seconds else 0:.0f} rows/sec)",
+            file=sys.stderr,
+        )
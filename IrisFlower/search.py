@@ -0,0 +1,215 @@
+# Hyperparameter search for the spot-check models with successive halving.
+# Every candidate starts on a few folds and a fraction of each fold's
+# training rows; after each rung only the best 1/eta go on, with eta times
+# the folds and data, until the survivors are scored on every full fold.
+#
+#   python search.py --models SVM KNN --candidates 20
+import argparse
+import math
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import (
+    ParameterGrid,
+    ParameterSampler,
+    StratifiedKFold,
+    train_test_split,
+)
+
+from dataset import DATA_CACHE_DIR, load_dataset
+from spotcheck import N_SPLITS, SCORING, SEED, fit_fold
+
+ETA = 3
+MIN_FOLDS = 2
+MIN_FRACTION = 0.2
+
+PARAM_GRIDS = {
+    "LR": {"C": [0.01, 0.1, 1.0, 10.0, 100.0]},
+    "LDA": [
+        {"solver": ["svd"]},
+        {"solver": ["lsqr"], "shrinkage": [None, "auto", 0.1, 0.5]},
+    ],
+    "KNN": {
+        "n_neighbors": [1, 3, 5, 7, 9, 15],
+        "weights": ["uniform", "distance"],
+    },
+    "CART": {
+        "max_depth": [None, 2, 3, 4, 6],
+        "min_samples_leaf": [1, 2, 5],
+        "criterion": ["gini", "entropy"],
+    },
+    "NB": {"var_smoothing": [1e-9, 1e-8, 1e-7, 1e-6, 1e-5]},
+    "SVM": {
+        "C": [0.1, 1.0, 10.0, 100.0],
+        "gamma": ["auto", "scale", 0.01, 0.1, 1.0],
+        "kernel": ["rbf", "linear"],
+    },
+}
+
+
+def candidates(grid, n_candidates=None, seed=SEED):
+    # The whole grid, or n_candidates sampled from it without repeats
+    grid_size = len(ParameterGrid(grid))
+    if n_candidates is None or n_candidates >= grid_size:
+        return list(ParameterGrid(grid))
+    return list(ParameterSampler(grid, n_candidates, random_state=seed))
+
+
+def subsample(train, y, fraction, seed):
+    # A stratified share of a fold's training rows
+    if fraction >= 1:
+        return train
+    subset, _ = train_test_split(
+        train, train_size=fraction, stratify=y[train], random_state=seed
+    )
+    return subset
+
+
+def rungs(n_candidates, n_splits, eta=ETA):
+    # (folds, fraction) per rung. The last rung is the full k-fold, and
+    # there are just enough rungs before it to leave about eta candidates
+    last = 0
+    while eta ** (last + 1) <= n_candidates:
+        last += 1
+    schedule = []
+    for rung in range(last + 1):
+        fraction = max(eta ** (rung - last), MIN_FRACTION)
+        folds = min(max(math.ceil(n_splits * fraction), MIN_FOLDS), n_splits)
+        schedule.append((folds, fraction))
+    return schedule
+
+
+def halve(
+    model,
+    params,
+    X,
+    y,
+    parallel,
+    n_splits=N_SPLITS,
+    seed=SEED,
+    scoring=SCORING,
+    eta=ETA,
+):
+    # Returns (params, fold scores) of the winner and the number of fits
+    kfold = StratifiedKFold(
+        n_splits=n_splits, random_state=seed, shuffle=True
+    )
+    folds = list(kfold.split(X, y))
+    estimators = [clone(model).set_params(**p) for p in params]
+    survivors = list(range(len(params)))
+    fits = 0
+
+    for folds_used, fraction in rungs(len(params), n_splits, eta):
+        jobs = [
+            (index, test, subsample(train, y, fraction, seed + fold))
+            for index in survivors
+            for fold, (train, test) in enumerate(folds[:folds_used])
+        ]
+        results = parallel(
+            delayed(fit_fold)(estimators[index], X, y, train, test, scoring)
+            for index, test, train in jobs
+        )
+        fits += len(jobs)
+
+        scores = {index: [] for index in survivors}
+        for (index, _, _), score in zip(jobs, results):
+            scores[index].append(score)
+        # Stable sort, so ties keep the order of the grid
+        survivors.sort(key=lambda index: -np.mean(scores[index]))
+        survivors = survivors[: max(math.ceil(len(survivors) / eta), 1)]
+
+    best = survivors[0]
+    return params[best], np.array(scores[best]), fits
+
+
+def search(
+    models,
+    X,
+    y,
+    grids=PARAM_GRIDS,
+    n_candidates=None,
+    n_splits=N_SPLITS,
+    seed=SEED,
+    scoring=SCORING,
+    eta=ETA,
+    n_jobs=-1,
+    backend="loky",
+):
+    # Returns one report per model in `models` that has a grid
+    X = np.asarray(X)
+    y = np.asarray(y)
+    reports = []
+    with Parallel(n_jobs=n_jobs, backend=backend) as parallel:
+        for name, model in models:
+            if name not in grids:
+                continue
+            start = time.perf_counter()
+            params = candidates(grids[name], n_candidates, seed)
+            best, scores, fits = halve(
+                model, params, X, y, parallel, n_splits, seed, scoring, eta
+            )
+            reports.append(
+                {
+                    "name": name,
+                    "params": best,
+                    "score": float(scores.mean()),
+                    "std": float(scores.std()),
+                    "candidates": len(params),
+                    "fits": fits,
+                    "seconds": time.perf_counter() - start,
+                }
+            )
+    return reports
+
+
+def format_report(report):
+    return (
+        f"{report['name']}: {report['score']:f} ({report['std']:f})"
+        f"  {report['candidates']} candidates, {report['fits']} fits,"
+        f" {report['seconds']:.2f}s  {report['params']}"
+    )
+
+
+if __name__ == "__main__":
+    from main import spot_check_models
+
+    parser = argparse.ArgumentParser(
+        description="Tune the spot-check models with successive halving"
+    )
+    parser.add_argument(
+        "--models", nargs="+", help="model names to tune, default all"
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        help="sample this many settings per model instead of the whole grid",
+    )
+    parser.add_argument("--eta", type=int, default=ETA)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--data")
+    parser.add_argument("--data-cache-dir", default=DATA_CACHE_DIR)
+    args = parser.parse_args()
+
+    X, y, classes = load_dataset(args.data, cache_dir=args.data_cache_dir)
+    # Tune on the same training split main.py spot-checks on
+    X_train, X_validation, Y_train, Y_validation = train_test_split(
+        X, y, test_size=0.20, random_state=1
+    )
+    models = [
+        (name, model)
+        for name, model in spot_check_models()
+        if args.models is None or name in args.models
+    ]
+    for report in search(
+        models,
+        X_train,
+        Y_train,
+        n_candidates=args.candidates,
+        seed=args.seed,
+        eta=args.eta,
+        n_jobs=args.jobs,
+    ):
+        print(format_report(report))
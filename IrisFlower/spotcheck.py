@@ -0,0 +1,123 @@
+# Spot-checks a list of models with stratified k-fold cross-validation.
+# Every (model, fold) pair is fitted as its own job in a process pool, and
+# each fold's score is cached on disk under a key made from the dataset, the
+# model's parameters and the fold split, so a re-run only fits what changed.
+import hashlib
+import json
+import os
+
+import numpy as np
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import StratifiedKFold
+
+from dataset import write_atomic
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, "cache", "spotcheck")
+N_SPLITS = 10
+SEED = 1
+SCORING = "accuracy"
+
+
+def dataset_hash(X, y):
+    digest = hashlib.sha256()
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    digest.update(repr(X.shape).encode())
+    digest.update(X.tobytes())
+    # Labels are usually strings, which have no stable byte layout in an
+    # object array
+    digest.update("\n".join(map(str, y)).encode())
+    return digest.hexdigest()
+
+
+def model_key(data_hash, model, n_splits, seed, scoring):
+    params = sorted(
+        (name, repr(value))
+        for name, value in model.get_params(deep=True).items()
+    )
+    key = {
+        "data": data_hash,
+        "model": type(model).__qualname__,
+        "params": params,
+        "n_splits": n_splits,
+        "seed": seed,
+        "scoring": scoring,
+        "sklearn": sklearn.__version__,
+    }
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+def fold_path(cache_dir, key, fold):
+    return os.path.join(cache_dir, f"{key}-{fold}.json")
+
+
+def read_fold(cache_dir, key, fold):
+    if cache_dir is None:
+        return None
+    path = fold_path(cache_dir, key, fold)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["score"]
+
+
+def write_fold(cache_dir, key, fold, score):
+    os.makedirs(cache_dir, exist_ok=True)
+    write_atomic(
+        fold_path(cache_dir, key, fold),
+        lambda f: json.dump({"score": score}, f),
+        mode="w",
+    )
+
+
+def fit_fold(model, X, y, train, test, scoring):
+    estimator = clone(model).fit(X[train], y[train])
+    return float(get_scorer(scoring)(estimator, X[test], y[test]))
+
+
+def spot_check(
+    models,
+    X,
+    y,
+    n_splits=N_SPLITS,
+    seed=SEED,
+    scoring=SCORING,
+    n_jobs=-1,
+    backend="loky",
+    cache_dir=CACHE_DIR,
+):
+    # Returns {name: array of fold scores} in the order of `models`.
+    # cache_dir=None turns the cache off.
+    X = np.asarray(X)
+    y = np.asarray(y)
+    kfold = StratifiedKFold(
+        n_splits=n_splits, random_state=seed, shuffle=True
+    )
+    folds = list(kfold.split(X, y))
+    data_hash = dataset_hash(X, y)
+
+    scores = {}
+    jobs = []
+    for name, model in models:
+        key = model_key(data_hash, model, n_splits, seed, scoring)
+        scores[name] = [
+            read_fold(cache_dir, key, fold) for fold in range(n_splits)
+        ]
+        for fold, (train, test) in enumerate(folds):
+            if scores[name][fold] is None:
+                jobs.append((name, key, fold, model, train, test))
+
+    if jobs:
+        results = Parallel(n_jobs=n_jobs, backend=backend)(
+            delayed(fit_fold)(model, X, y, train, test, scoring)
+            for _, _, _, model, train, test in jobs
+        )
+        for (name, key, fold, *_), score in zip(jobs, results):
+            scores[name][fold] = score
+            if cache_dir is not None:
+                write_fold(cache_dir, key, fold, score)
+
+    return {name: np.array(values) for name, values in scores.items()}
@@ -1,10 +1,28 @@
 import numpy as np
+import json
 import pickle
 import os
 import random
 from time import sleep
 
-Q_TABLE_PATH = 'q_table.pickle'
+Q_TABLE_PATH = 'q_table.npy'
+
+# Lookup tables indexed by the state code from Game.get_state
+POWERS = 3 ** np.arange(9)
+LINES = np.array([
+    [0, 1, 2], [3, 4, 5], [6, 7, 8],
+    [0, 3, 6], [1, 4, 7], [2, 5, 8],
+    [0, 4, 8], [2, 4, 6]
+])
+CELLS = np.arange(19683)[:, None] // POWERS % 3
+WINNER = np.zeros(19683, dtype=np.int8)
+for number in (2, 1):
+    WINNER[np.all(CELLS[:, LINES] == number, axis=2).any(axis=1)] = number
+LEGAL = ((CELLS == 0) << np.arange(9)).sum(axis=1)
+LEGAL_ACTIONS = [np.flatnonzero(mask >> np.arange(9) & 1) for mask in range(512)]
+# Bitboards: bit n is cell n, HAS_LINE[board] is True if it contains a line
+WIN_MASKS = [int(sum(1 << cell for cell in line)) for line in LINES]
+HAS_LINE = [any(board & m == m for m in WIN_MASKS) for board in range(512)]
 
 
 class Player:
@@ -31,32 +49,55 @@ class Player:
 
 
 class Computer:
-    def __init__(self, game, learn_rate=0, explore_rate=0):
+    def __init__(self, game, learn_rate=0, explore_rate=0, learn_invalid=False,
+                 discount=0.8, path=None):
         self.action_space = game.action_space
         self.actions = [x for x in range(0, self.action_space)]
         self.observation_space = game.observation_space
-
-        if os.path.exists(Q_TABLE_PATH):
-            with open(Q_TABLE_PATH, 'rb') as f:
-                self.q_table = pickle.load(f)
-        else:
-            self.q_table = np.zeros((self.observation_space, self.action_space))
+        self.path = Q_TABLE_PATH if path is None else path
+        legacy_path = os.path.splitext(self.path)[0] + '.pickle'
+        # Hyperparameters and game count go in a JSON header beside the table
+        self.header_path = os.path.splitext(self.path)[0] + '.json'
 
         self.alpha = learn_rate
-        self.gamma = 0.8
+        self.gamma = discount
         self.epsilon = explore_rate
+        self.learn_invalid = learn_invalid
+        self.games = 0
+        if os.path.exists(self.header_path):
+            with open(self.header_path) as f:
+                self.games = json.load(f).get('games', 0)
+
+        if not os.path.exists(self.path) and os.path.exists(legacy_path):
+            # Convert an old pickled table once
+            with open(legacy_path, 'rb') as f:
+                self.q_table = pickle.load(f)
+            self.save_data()
 
-    def get_action(self, game):
-        if random.uniform(0, 1) < self.epsilon:
-            action = random.choice(self.actions)
+        if os.path.exists(self.path):
+            # Copy-on-write map: instant load, pages shared between processes
+            self.q_table = np.load(self.path, mmap_mode='c')
         else:
-            action = np.argmax(self.q_table[game.get_state()])
+            self.q_table = np.zeros((self.observation_space, self.action_space))
 
-        if not game.is_valid(action):
-            self.q_table[game.get_state(), action] = -10
-            return self.get_action(game)
+    def get_action(self, game):
+        state = game.get_state()
+        if not self.learn_invalid:
+            legal = game.legal_actions()
+            if random.uniform(0, 1) < self.epsilon:
+                return random.choice(legal)
+            return legal[np.argmax(self.q_table[state][legal])]
+
+        # Pick from every cell and learn a penalty for occupied ones
+        while True:
+            if random.uniform(0, 1) < self.epsilon:
+                action = random.choice(self.actions)
+            else:
+                action = np.argmax(self.q_table[state])
 
-        return action
+            if game.is_valid(action):
+                return action
+            self.q_table[state, action] = -10
 
     def reward(self, old_state, action, reward, new_state):
         old_value = self.q_table[old_state, action]
@@ -66,14 +107,26 @@ class Computer:
         self.q_table[old_state, action] = new_value
 
     def save_data(self):
-        with open(Q_TABLE_PATH, 'wb+') as f:
-            pickle.dump(self.q_table, f)
+        with open(self.path + '.tmp', 'wb') as f:
+            np.save(f, self.q_table)
+        os.replace(self.path + '.tmp', self.path)
+
+        header = {
+            'alpha': self.alpha,
+            'gamma': self.gamma,
+            'epsilon': self.epsilon,
+            'games': self.games,
+        }
+        with open(self.header_path + '.tmp', 'w') as f:
+            json.dump(header, f)
+        os.replace(self.header_path + '.tmp', self.header_path)
 
 
 class Game:
     def __init__(self):
         self.observation_space = 19683
         self.action_space = 9
+        self.state = 0
         self.board = [
             [0, 0, 0],
             [0, 0, 0],
@@ -102,29 +155,18 @@ class Game:
             return self.rewards['invalid'], False
         index = self.actions[action]
         self.board[index[0]][index[1]] = player_num
-        if self.is_winner(player_num):
+        self.state += player_num * 3 ** int(action)
+        if WINNER[self.state] == player_num:
             return self.rewards['win'], True
-        found = False
-        for sub_list in self.board:
-            for item in sub_list:
-                if item == 0:
-                    found = True
-        if found == False:
+        if LEGAL[self.state] == 0:
             return 0, True
         return -1, False
 
     def get_state(self):
-        max_num = 3
-        arr2 = sum(self.board, [])
-        degrees = max_num ** np.arange(len(arr2))
-        state = arr2 @ degrees
-        return state
+        return self.state
 
     def is_valid(self, action):
-        index = self.actions[action]
-        if self.board[index[0]][index[1]] != 0:
-            return False
-        return True
+        return bool(LEGAL[self.state] >> action & 1)
 
     def print_board(self):
         chars = ['_', 'X', 'O']
@@ -134,31 +176,90 @@ class Game:
                 print(chars[item], end = ' ')
             print()
 
-    def win_indexes(self, n):
-        # Rows
-        for r in range(n):
-            yield [(r, c) for c in range(n)]
-        # Columns
-        for c in range(n):
-            yield [(r, c) for r in range(n)]
-        # Diagonal top left to bottom right
-        yield [(i, i) for i in range(n)]
-        # Diagonal top right to bottom left
-        yield [(i, n - 1 - i) for i in range(n)]
+    def legal_actions(self):
+        return LEGAL_ACTIONS[LEGAL[self.state]]
 
     def is_winner(self, decorator):
-        n = len(self.board)
-        for indexes in self.win_indexes(n):
-            if all(self.board[r][c] == decorator for r, c in indexes):
-                return True
-        return False
+        return WINNER[self.state] == decorator
+
+
+class BitboardGame:
+    # Same interface as Game, with each player's marks as a 9-bit integer
+    __slots__ = ('x', 'o', 'state')
+    observation_space = 19683
+    action_space = 9
+    actions = {
+        0: (0, 0),
+        1: (0, 1),
+        2: (0, 2),
+        3: (1, 0),
+        4: (1, 1),
+        5: (1, 2),
+        6: (2, 0),
+        7: (2, 1),
+        8: (2, 2)
+    }
+    rewards = {
+        'win': 10,
+        'lose': -10,
+        'draw': 0,
+        'invalid': -10
+    }
 
+    def __init__(self):
+        self.x = 0
+        self.o = 0
+        self.state = 0
 
-def train():
-    game = Game()
-    computer = Computer(game, learn_rate=0.1, explore_rate=0.1)
+    def step(self, action, player_num):
+        action = int(action)
+        if not self.is_valid(action):
+            return self.rewards['invalid'], False
+        if player_num == 1:
+            self.x |= 1 << action
+        else:
+            self.o |= 1 << action
+        self.state += player_num * 3 ** action
+        if self.is_winner(player_num):
+            return self.rewards['win'], True
+        if self.x | self.o == 511:
+            return 0, True
+        return -1, False
+
+    def get_state(self):
+        return self.state
 
-    for _ in range(0, 100000):
+    def is_valid(self, action):
+        return not (self.x | self.o) >> action & 1
+
+    def print_board(self):
+        os.system('clear')
+        for row in range(3):
+            for col in range(3):
+                bit = 1 << (row * 3 + col)
+                if self.x & bit:
+                    print('X', end = ' ')
+                elif self.o & bit:
+                    print('O', end = ' ')
+                else:
+                    print('_', end = ' ')
+            print()
+
+    def legal_actions(self):
+        return LEGAL_ACTIONS[~(self.x | self.o) & 511]
+
+    def is_winner(self, decorator):
+        return HAS_LINE[self.x if decorator == 1 else self.o]
+
+
+def train(games=100000, alpha=0.1, gamma=0.8, epsilon=0.1, out=Q_TABLE_PATH,
+          game_cls=Game):
+    game = game_cls()
+    computer = Computer(game, learn_rate=alpha, explore_rate=epsilon,
+                        discount=gamma, path=out)
+
+    for _ in range(0, games):
+        computer.games += 1
         c1_states = []
         c2_states = []
         running = True
@@ -251,8 +352,7 @@ def menu():
     return choice
 
 
-def main():
-    global Q_TABLE_PATH
+def interactive():
     while True:
         choice = menu()
         if choice == 0:
@@ -264,4 +364,28 @@ def main():
             train()
 
 
-main()
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Q-Learning TicTacToe. Run without a command for the menu.')
+    commands = parser.add_subparsers(dest='command')
+    train_parser = commands.add_parser('train', help='train without prompts')
+    train_parser.add_argument('--games', type=int, default=100000)
+    train_parser.add_argument('--alpha', type=float, default=0.1)
+    train_parser.add_argument('--gamma', type=float, default=0.8)
+    train_parser.add_argument('--epsilon', type=float, default=0.1)
+    train_parser.add_argument('--out', default=Q_TABLE_PATH)
+    train_parser.add_argument('--bitboard', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.command == 'train':
+        game_cls = BitboardGame if args.bitboard else Game
+        train(args.games, args.alpha, args.gamma, args.epsilon, args.out,
+              game_cls)
+    else:
+        interactive()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# Headless matches between policies, played as one vectorized batch
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+from solver import greedy_actions, load_solution
+from states import (
+    CELL_COUNT,
+    CELLS,
+    EMPTY,
+    LEGAL,
+    O,
+    POWERS,
+    TERMINAL,
+    WINNER,
+    X,
+)
+from storage import (
+    C1_TABLE,
+    C2_TABLE,
+    load_q_table,
+    require_3x3,
+    require_table,
+)
+
+
+def random_legal(mask, rng):
+    # One uniformly random set bit of each row of a boolean mask
+    noise = np.where(mask, rng.random(mask.shape), -1)
+    return np.argmax(noise, axis=1)
+
+
+class RandomPolicy:
+    name = "random"
+
+    def act(self, states, number, rng):
+        return random_legal(CELLS[states] == EMPTY, rng)
+
+
+class SolverPolicy:
+    # Picks uniformly among the perfect-play moves
+    name = "solver"
+
+    def __init__(self, solution=None):
+        if solution is None:
+            solution = load_solution()
+        _, self.optimal = solution
+
+    def act(self, states, number, rng):
+        bits = self.optimal[states, None] >> np.arange(CELL_COUNT) & 1
+        return random_legal(bits.astype(bool), rng)
+
+
+class QPolicy:
+    # Greedy play from one Q-table per side
+    def __init__(self, q_tables, name="q-table"):
+        self.q_tables = q_tables
+        self.name = name
+
+    def act(self, states, number, rng):
+        return greedy_actions(self.q_tables[number], states)
+
+
+def load_policy(spec):
+    # "random", "solver", a directory holding c1/c2 tables or one table file
+    if spec == "random":
+        return RandomPolicy()
+    if spec == "solver":
+        return SolverPolicy()
+    if os.path.isdir(spec):
+        paths = {
+            X: os.path.join(spec, C1_TABLE),
+            O: os.path.join(spec, C2_TABLE),
+        }
+    else:
+        paths = {X: spec, O: spec}
+    for path in paths.values():
+        require_table(path)
+    q_tables = {
+        number: require_3x3(load_q_table(path)[0], path)
+        for number, path in paths.items()
+    }
+    return QPolicy(q_tables, spec)
+
+
+def play_matches(p1, p2, games, rng):
+    # Returns the winner's number (or 0 for a draw) of each game
+    states = np.zeros(games, dtype=np.int64)
+    live = np.ones(games, dtype=bool)
+    p_list = [(p1, X), (p2, O)]
+
+    for ply in range(CELL_COUNT):
+        policy, number = p_list[ply % 2]
+        idx = np.flatnonzero(live)
+        if len(idx) == 0:
+            break
+        actions = policy.act(states[idx], number, rng)
+        if not np.all(LEGAL[states[idx]] >> actions & 1):
+            raise ValueError(f"{policy.name} played an occupied cell")
+        states[idx] += number * POWERS[actions]
+        live[idx[TERMINAL[states[idx]]]] = False
+
+    return WINNER[states]
+
+
+def wilson(successes, trials, z=1.96):
+    # 95% Wilson score interval for a binomial rate
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denom = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials**2))
+    return max(0.0, centre - half / denom), min(1.0, centre + half / denom)
+
+
+def evaluate(policy, opponent, games=10000, seed=None):
+    # `policy` plays half the games as X and half as O
+    rng = np.random.default_rng(seed)
+    first = games // 2
+    as_x = play_matches(policy, opponent, first, rng)
+    as_o = play_matches(opponent, policy, games - first, rng)
+
+    wins = int((as_x == X).sum() + (as_o == O).sum())
+    losses = int((as_x == O).sum() + (as_o == X).sum())
+    draws = games - wins - losses
+    report = {"games": games}
+    for name, count in [("win", wins), ("draw", draws), ("loss", losses)]:
+        report[name] = count
+        report[f"{name}_rate"] = count / games if games else 0.0
+        report[f"{name}_ci"] = wilson(count, games)
+    return report
+
+
+def format_report(name, opponent, report):
+    lines = [f"{name} vs {opponent} ({report['games']} games)"]
+    for outcome in ["win", "draw", "loss"]:
+        low, high = report[f"{outcome}_ci"]
+        lines.append(
+            f"  {outcome:5} {report[f'{outcome}_rate']:7.2%}"
+            f"  [{low:.2%}, {high:.2%}]"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Play headless matches between TicTacToe policies"
+    )
+    parser.add_argument(
+        "policy", help="table directory, table file, 'random' or 'solver'"
+    )
+    parser.add_argument("opponents", nargs="+", help="policies to play")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--max-loss-rate",
+        type=float,
+        help="exit with status 1 if the loss rate is above this against any "
+        "opponent",
+    )
+    args = parser.parse_args()
+
+    try:
+        policy = load_policy(args.policy)
+        opponents = [load_policy(spec) for spec in args.opponents]
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    passed = True
+    for spec, opponent in zip(args.opponents, opponents):
+        report = evaluate(policy, opponent, args.games, args.seed)
+        print(format_report(args.policy, spec, report))
+        if (
+            args.max_loss_rate is not None
+            and report["loss_rate"] > args.max_loss_rate
+        ):
+            passed = False
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,215 @@
+# Vectorized self-play: every live game of a batch advances one ply at a time
+import numpy as np
+
+from learners import td_update
+from states import (
+    ACTION_REWARD,
+    ACTION_SPACE,
+    CELLS,
+    DRAW_REWARD,
+    EMPTY,
+    INVALID_REWARD,
+    LOSE_REWARD,
+    POWERS,
+    WIN_REWARD,
+    WINNER,
+)
+from training import progress_bar, save_players
+
+BATCH_SIZE = 4096
+
+
+def learn(ai, old_states, actions, rewards, new_states):
+    if len(old_states) == 0:
+        return
+    next_max = np.max(ai.q_table[new_states], axis=1)
+    targets = rewards + ai.gamma * next_max
+    td_update(
+        ai.q_table,
+        old_states,
+        actions,
+        targets,
+        ai.alpha,
+        getattr(ai, "visits", None),
+    )
+
+
+def select_actions(ai, states, rng):
+    n = len(states)
+    ai.moves += n
+    legal = CELLS[states] == EMPTY
+
+    # Exploration samples uniformly from the empty cells only
+    noise = np.where(legal, rng.random(legal.shape), -1)
+    actions = np.argmax(noise, axis=1)
+
+    greedy = rng.random(n) >= ai.epsilon
+    if greedy.any():
+        states = states[greedy]
+        legal = legal[greedy]
+        rows = ai.q_table[states]
+        masked = np.where(legal, rows, -np.inf)
+        best = np.argmax(masked, axis=1)
+        best_value = masked[np.arange(len(best)), best][:, None]
+
+        if getattr(ai, "learn_invalid", False):
+            # Penalise the occupied cells Computer.get_action would have
+            # tried (and learned INVALID_REWARD for) before the legal argmax
+            columns = np.arange(ACTION_SPACE)
+            tried = ~legal & (
+                (rows > best_value)
+                | ((rows == best_value) & (columns < best[:, None]))
+            )
+            rows_idx, cols_idx = np.nonzero(tried)
+            ai.invalid_moves += len(rows_idx)
+            if len(rows_idx):
+                ai.q_table[states[rows_idx], cols_idx] = INVALID_REWARD
+
+        actions[greedy] = best
+    return actions
+
+
+def play_batch(p1, p2, n, rng):
+    states = np.zeros(n, dtype=np.int64)
+    live = np.ones(n, dtype=bool)
+
+    p_list = [p1, p2]
+    last_states = [np.zeros(n, dtype=np.int64) for _ in p_list]
+    last_actions = [np.zeros(n, dtype=np.int64) for _ in p_list]
+
+    for ply in range(ACTION_SPACE):
+        turn = ply % 2
+        ai = p_list[turn]
+        other = p_list[1 - turn]
+
+        idx = np.flatnonzero(live)
+        old_states = states[idx]
+        if ply >= 2:
+            learn(
+                ai,
+                last_states[turn][idx],
+                last_actions[turn][idx],
+                ACTION_REWARD,
+                old_states,
+            )
+
+        actions = select_actions(ai, old_states, rng)
+        states[idx] = old_states + ai.number * POWERS[actions]
+        last_states[turn][idx] = old_states
+        last_actions[turn][idx] = actions
+
+        won = WINNER[states[idx]] == ai.number
+        done = won | (ply == ACTION_SPACE - 1)
+        if not done.any():
+            continue
+
+        ended = idx[done]
+        won = won[done]
+        learn(
+            ai,
+            last_states[turn][ended],
+            last_actions[turn][ended],
+            np.where(won, WIN_REWARD, DRAW_REWARD),
+            states[ended],
+        )
+        learn(
+            other,
+            last_states[1 - turn][ended],
+            last_actions[1 - turn][ended],
+            np.where(won, LOSE_REWARD, DRAW_REWARD),
+            states[ended],
+        )
+        live[ended] = False
+
+    return WINNER[states]
+
+
+def play_episodes(p1, p2, n, rng):
+    # Plays n games without learning and hands each player's moves to its
+    # learner in one pass
+    states = np.zeros((n, ACTION_SPACE), dtype=np.int64)
+    actions = np.zeros((n, ACTION_SPACE), dtype=np.int64)
+    lengths = np.full(n, ACTION_SPACE)
+    final = np.zeros(n, dtype=np.int64)
+    live = np.ones(n, dtype=bool)
+    p_list = [p1, p2]
+
+    for ply in range(ACTION_SPACE):
+        ai = p_list[ply % 2]
+        idx = np.flatnonzero(live)
+        states[idx, ply] = final[idx]
+        actions[idx, ply] = select_actions(ai, final[idx], rng)
+        final[idx] += ai.number * POWERS[actions[idx, ply]]
+
+        won = idx[WINNER[final[idx]] == ai.number]
+        lengths[won] = ply + 1
+        live[won] = False
+
+    winners = WINNER[final]
+    for turn, ai in enumerate(p_list):
+        plies = np.arange(turn, ACTION_SPACE, 2)
+        valid = plies < lengths[:, None]
+        # A move's next state is the one the player faces on its next turn,
+        # or the final board after its last move
+        following = plies + 2 < lengths[:, None]
+        next_states = np.where(
+            following,
+            states[:, np.minimum(plies + 2, ACTION_SPACE - 1)],
+            final[:, None],
+        )
+        last = valid & ~following
+        outcome = np.select(
+            [winners == ai.number, winners == 0],
+            [WIN_REWARD, DRAW_REWARD],
+            LOSE_REWARD,
+        )
+        rewards = np.where(last, outcome[:, None], ACTION_REWARD)
+        ai.learner.learn(
+            ai,
+            states[:, plies],
+            actions[:, plies],
+            rewards,
+            next_states,
+            valid,
+            last,
+        )
+    return winners
+
+
+def batch_train(
+    p1,
+    p2,
+    loops,
+    batch_size=BATCH_SIZE,
+    seed=None,
+    progress=True,
+    monitor=None,
+    checkpoint=None,
+):
+    rng = np.random.default_rng(seed)
+    # Players with a learner learn from whole games at the end of a batch
+    play = play_batch if p1.learner is None else play_episodes
+    if monitor is not None:
+        monitor.start([p1, p2])
+    if checkpoint is not None:
+        rng = checkpoint.start([p1, p2], rng)
+
+    with progress_bar("Training", loops, progress) as bar:
+        remaining = loops
+        stop = False
+        while remaining > 0 and not stop:
+            n = min(batch_size, remaining)
+            if monitor is None:
+                play(p1, p2, n, rng)
+            else:
+                with monitor.timer("play", n):
+                    winners = play(p1, p2, n, rng)
+                stop = monitor.games_over(winners)
+            remaining -= n
+            p1.games += n
+            p2.games += n
+            if checkpoint is not None:
+                checkpoint.update(rng)
+            bar.next(n)
+
+    save_players([p1, p2], monitor, checkpoint, rng)
@@ -0,0 +1,138 @@
+# Periodic checkpoints of a training run: both Q-tables, any replay
+# buffers, plus a small JSON file with the target game count and RNG state,
+# so an interrupted run can resume where its last checkpoint left off
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from storage import write_atomic
+
+CHECKPOINT = "checkpoint.json"
+REPLAY = "replay_c{}.npy"
+LAST_MOVE = ("last_state", "last_action")
+
+
+def as_int(value):
+    return None if value is None else int(value)
+
+
+def rng_state(rng):
+    # rng is a numpy Generator, a SeedSequence or None for the random module
+    if rng is None:
+        return {"kind": "random", "state": random.getstate()}
+    if isinstance(rng, np.random.SeedSequence):
+        return {
+            "kind": "seed_sequence",
+            "entropy": rng.entropy,
+            "spawned": rng.n_children_spawned,
+        }
+    return {"kind": "generator", "state": rng.bit_generator.state}
+
+
+class Checkpoint:
+    def __init__(
+        self, out, every_games=None, every_seconds=None, resume=False
+    ):
+        self.path = os.path.join(out, CHECKPOINT)
+        self.out = out
+        self.every_games = every_games
+        self.every_seconds = every_seconds
+        self.saved = None
+        if resume and os.path.exists(self.path):
+            with open(self.path) as f:
+                self.saved = json.load(f)
+
+    def remaining(self, p_list, games):
+        # Games left to play: what the checkpoint still had to go when
+        # resuming, otherwise all of `games`
+        done = p_list[0].games
+        if self.saved is not None:
+            self.target = self.saved["target"]
+        elif games is None:
+            raise ValueError(f"Nothing to resume: {self.path} does not exist")
+        else:
+            self.target = done + games
+        return max(self.target - done, 0)
+
+    def start(self, p_list, rng=None):
+        # Returns rng, restored to its checkpointed state when resuming
+        self.p_list = p_list
+        self.last_games = p_list[0].games
+        self.last_time = time.monotonic()
+
+        if self.saved is not None:
+            # Sequential training carries each player's last move over into
+            # the next game
+            for ai, last in zip(p_list, self.saved["last"]):
+                for name, value in zip(LAST_MOVE, last):
+                    setattr(ai, name, value)
+            for ai, state in zip(p_list, self.saved.get("replay", [])):
+                replay = getattr(ai, "replay", None)
+                if state is not None and replay is not None:
+                    replay.set_state(
+                        state, np.load(self.replay_path(ai.number))
+                    )
+
+        state = self.saved["rng"] if self.saved is not None else None
+        if state is None or state["kind"] != rng_state(rng)["kind"]:
+            return rng
+        if state["kind"] == "random":
+            version, internal, gauss = state["state"]
+            random.setstate((version, tuple(internal), gauss))
+        elif state["kind"] == "seed_sequence":
+            rng = np.random.SeedSequence(
+                state["entropy"], n_children_spawned=state["spawned"]
+            )
+        else:
+            rng.bit_generator.state = state["state"]
+        return rng
+
+    def update(self, rng=None, sync=None):
+        # Called after every game or batch; sync copies worker tables back
+        # into the players before they are saved
+        games = self.p_list[0].games
+        if (
+            self.every_games is not None
+            and games - self.last_games >= self.every_games
+        ) or (
+            self.every_seconds is not None
+            and time.monotonic() - self.last_time >= self.every_seconds
+        ):
+            if sync is not None:
+                sync()
+            self.save(rng)
+
+    def replay_path(self, number):
+        return os.path.join(self.out, REPLAY.format(number))
+
+    def save_replay(self, ai):
+        replay = getattr(ai, "replay", None)
+        if replay is None:
+            return None
+        write_atomic(
+            self.replay_path(ai.number), lambda f: np.save(f, replay.data)
+        )
+        return replay.get_state()
+
+    def save(self, rng=None):
+        for ai in self.p_list:
+            ai.save_q_table()
+        replay = [self.save_replay(ai) for ai in self.p_list]
+        # Written after the tables, so a checkpoint never points past them
+        games = self.p_list[0].games
+        state = {
+            "target": self.target,
+            "games": games,
+            "rng": rng_state(rng),
+            "last": [
+                [as_int(getattr(ai, name, None)) for name in LAST_MOVE]
+                for ai in self.p_list
+            ],
+            "replay": replay,
+        }
+        write_atomic(self.path, lambda f: f.write(json.dumps(state).encode()))
+        self.last_games = games
+        self.last_time = time.monotonic()
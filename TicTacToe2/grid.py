@@ -0,0 +1,98 @@
+# N x N boards with k in a row to win. State codes are still base 3, but
+# the Q-table has to be a SparseQTable since 3 ** (N * N) rows won't fit.
+import os
+
+import numpy as np
+
+from states import DRAW, EMPTY, GOING, INVALID, O, WIN, X
+
+# State codes are saved as the uint64 keys of a SparseQTable, and
+# 3 ** (7 * 7) doesn't fit in one
+MAX_SIZE = 6
+
+
+def win_lines(size, win_length):
+    # Every run of win_length cells along a row, column or diagonal
+    grid = np.arange(size * size).reshape(size, size)
+    steps = np.arange(win_length)
+    lines = []
+    for r in range(size):
+        for c in range(size):
+            for dr, dc in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                rows = r + dr * steps
+                cols = c + dc * steps
+                if rows[-1] < size and 0 <= cols[-1] < size:
+                    lines.append(grid[rows, cols])
+    return np.array(lines)
+
+
+class GridGame:
+    # Subclassed by grid_game() with a board size, win length and its lines,
+    # so Game-style resets through game.__init__() keep working
+    def __init__(self):
+        self.cells = np.zeros(self.size * self.size, dtype=np.int8)
+        self.state = 0
+        self.status = GOING
+
+    def step(self, action, number):
+        action = int(action)
+        if not self.is_valid(action):
+            return INVALID
+
+        self.cells[action] = number
+        self.state += number * 3 ** action
+
+        # Only lines through the new mark can have been completed
+        lines = self.cells[self.cell_lines[action]]
+        if np.all(lines == number, axis=1).any():
+            self.status = WIN
+            return WIN
+        elif self.is_draw():
+            self.status = DRAW
+            return DRAW
+
+    def get_state(self):
+        return self.state
+
+    def is_valid(self, action):
+        return self.cells[action] == EMPTY
+
+    def legal_actions(self):
+        return np.flatnonzero(self.cells == EMPTY)
+
+    def is_winner(self, decorator):
+        return np.all(self.cells[self.lines] == decorator, axis=1).any()
+
+    def is_draw(self):
+        return not (self.cells == EMPTY).any()
+
+    def print_board(self, clear=True):
+        if clear:
+            os.system("clear")
+        chars = {EMPTY: "_", X: "X", O: "O"}
+        for row in self.cells.reshape(self.size, self.size):
+            print(" ".join(chars[item] for item in row))
+
+
+def grid_game(size, win_length=None):
+    if win_length is None:
+        win_length = size
+    if not 1 <= size <= MAX_SIZE:
+        raise ValueError(f"Boards can be at most {MAX_SIZE}x{MAX_SIZE}")
+    if not 1 <= win_length <= size:
+        raise ValueError("win_length must be between 1 and the board size")
+
+    lines = win_lines(size, win_length)
+    return type(
+        f"GridGame{size}x{size}k{win_length}",
+        (GridGame,),
+        {
+            "size": size,
+            "win_length": win_length,
+            "lines": lines,
+            "cell_lines": [
+                lines[(lines == cell).any(axis=1)]
+                for cell in range(size * size)
+            ],
+        },
+    )
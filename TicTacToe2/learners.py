@@ -0,0 +1,120 @@
+# Learners that update a Q-table from whole episodes at once. Every one of
+# them only works out the targets and leaves the update to td_update.
+#
+# Episodes are (games, moves) arrays holding one player's moves; `valid`
+# marks real moves and `last` each game's final one, after which there is
+# no next state to bootstrap from.
+import copy
+
+import numpy as np
+
+from states import ACTION_SPACE
+
+
+def td_update(q_table, states, actions, targets, alpha, visits=None):
+    # Transitions that hit the same (state, action) pair in one batch are
+    # averaged into a single update instead of overwriting each other.
+    keys = states * ACTION_SPACE + actions
+    keys, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse)
+    targets = np.bincount(inverse, weights=targets) / counts
+    states, actions = np.divmod(keys, ACTION_SPACE)
+
+    old_values = q_table[states, actions]
+    q_table[states, actions] = (1 - alpha) * old_values + alpha * targets
+    if visits is not None:
+        visits[states, actions] = visits[states, actions] + counts
+
+
+class Learner:
+    def __init__(self, seed=None):
+        # seed is for learners that draw random numbers
+        pass
+
+    def targets(self, ai, states, actions, rewards, next_states, last):
+        raise NotImplementedError
+
+    def learn(self, ai, states, actions, rewards, next_states, valid, last):
+        targets = self.targets(ai, states, actions, rewards, next_states, last)
+        td_update(
+            ai.q_table, states[valid], actions[valid], targets[valid], ai.alpha
+        )
+
+
+class QLearning(Learner):
+    def targets(self, ai, states, actions, rewards, next_states, last):
+        next_max = np.max(ai.q_table[next_states.ravel()], axis=1)
+        next_max = next_max.reshape(next_states.shape)
+        return rewards + np.where(last, 0, ai.gamma * next_max)
+
+
+class Sarsa(Learner):
+    # Bootstraps from the move the player actually made next
+    def targets(self, ai, states, actions, rewards, next_states, last):
+        next_actions = np.zeros_like(actions)
+        next_actions[:, :-1] = actions[:, 1:]
+        next_values = ai.q_table[next_states.ravel(), next_actions.ravel()]
+        next_values = next_values.reshape(next_states.shape)
+        return rewards + np.where(last, 0, ai.gamma * next_values)
+
+
+class MonteCarlo(Learner):
+    # Every move is pulled towards the discounted return of its game
+    def targets(self, ai, states, actions, rewards, next_states, last):
+        returns = np.zeros(rewards.shape)
+        following = np.zeros(len(rewards))
+        for move in range(rewards.shape[1] - 1, -1, -1):
+            following = rewards[:, move] + np.where(
+                last[:, move], 0, ai.gamma * following
+            )
+            returns[:, move] = following
+        return returns
+
+
+class DoubleQ(Learner):
+    # Two estimates, each updated with the other's value of its own greedy
+    # action. ai.q_table holds their mean, which is what gets played and
+    # saved; the estimates themselves are not, so runs can't be resumed.
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.tables = None
+
+    def learn(self, ai, states, actions, rewards, next_states, valid, last):
+        if self.tables is None:
+            self.tables = [copy.deepcopy(ai.q_table) for _ in range(2)]
+
+        states = states[valid]
+        actions = actions[valid]
+        rewards = rewards[valid]
+        next_states = next_states[valid]
+        last = last[valid]
+
+        first = self.rng.random(len(states)) < 0.5
+        for picked, (update, evaluate) in [
+            (first, self.tables),
+            (~first, self.tables[::-1]),
+        ]:
+            if not picked.any():
+                continue
+            upcoming = next_states[picked]
+            best = np.argmax(update[upcoming], axis=1)
+            next_values = evaluate[upcoming, best]
+            targets = rewards[picked] + np.where(
+                last[picked], 0, ai.gamma * next_values
+            )
+            td_update(
+                update, states[picked], actions[picked], targets, ai.alpha
+            )
+
+        a, b = self.tables
+        ai.q_table[states, actions] = (
+            a[states, actions] + b[states, actions]
+        ) / 2
+
+
+LEARNERS = {
+    "q-learning": QLearning,
+    "sarsa": Sarsa,
+    "double-q": DoubleQ,
+    "monte-carlo": MonteCarlo,
+}
@@ -1,20 +1,50 @@
 # Import Libraries
 import os
-import pickle
 import random
 from time import sleep
 
 import numpy as np
-from progress.bar import Bar
 
-# Set Globals
-# Q-Tables:
-C1_TABLE = "c1_q_table.pickle"
-C2_TABLE = "c2_q_table.pickle"
+import storage
+from qtable import CanonicalQTable, CompactQTable
+from states import (
+    ACTION_REWARD,
+    ACTION_SPACE,
+    DRAW,
+    DRAW_REWARD,
+    EMPTY,
+    FULL_MASK,
+    GOING,
+    HAS_LINE,
+    INVALID,
+    INVALID_REWARD,
+    LEGAL,
+    LEGAL_ACTIONS,
+    LOSE_REWARD,
+    O,
+    OBSERVATION_SPACE,
+    WIN,
+    WIN_REWARD,
+    WINNER,
+    X,
+)
+from storage import C1_TABLE, C2_TABLE
+from training import progress_bar, save_players
+
+
+def table_names(size=3, win_length=3):
+    # Tables for other boards carry their geometry, e.g. c1_q_table_4x4k4.npy,
+    # so they never get mixed up with the 3x3 ones in the same directory
+    if (size, win_length) == (3, 3):
+        return C1_TABLE, C2_TABLE
+    suffix = f"_{size}x{size}k{win_length}"
+    return tuple(
+        os.path.splitext(name)[0] + suffix + storage.TABLE_EXT
+        for name in (C1_TABLE, C2_TABLE)
+    )
+
 
-# Action/Observation Space
-ACTION_SPACE = 9
-OBSERVATION_SPACE = 3 ** 9
+# Board cell of each action
 ACTIONS = {
     0: (0, 0),
     1: (0, 1),
@@ -27,27 +57,6 @@ ACTIONS = {
     8: (2, 2),
 }
 
-# Rewards/Penalties
-WIN_REWARD = 10
-LOSE_REWARD = -10
-DRAW_REWARD = 0
-ACTION_REWARD = -1
-INVALID_REWARD = -20
-
-# Board Square States
-EMPTY = 0
-X = 1
-O = 2
-
-# Game States
-GOING = "going"
-WIN = "win"
-DRAW = "draw"
-
-# Action Types
-INVALID = "invalidAction"
-
-
 def color(r, g, b, text):
     return "\033[38;2;{};{};{}m{}\033[38;2;255;255;255m".format(r, g, b, text)
 
@@ -91,6 +100,7 @@ def safe_input(prompt=None, in_type=str, check=None):
 class Game:
     def __init__(self):
         self.board = np.zeros((3, 3))
+        self.state = 0
         self.status = GOING
 
     def step(self, action, number):
@@ -98,49 +108,33 @@ class Game:
             return INVALID
 
         self.board[ACTIONS[action]] = number
+        self.state += number * 3 ** int(action)
 
-        if self.is_winner(number):
+        if WINNER[self.state] == number:
             self.status = WIN
             return WIN
-        elif self.is_draw():
+        elif LEGAL[self.state] == 0:
             self.status = DRAW
             return DRAW
 
     def get_state(self):
-        max_num = 3
-        arr2 = self.board.reshape(-1)
-        degrees = max_num ** np.arange(len(arr2))
-        state = arr2 @ degrees
-        return state
+        return self.state
 
     def is_valid(self, action):
-        if self.board[ACTIONS[action]] != EMPTY:
-            return False
-        return True
+        return bool(LEGAL[self.state] >> action & 1)
 
-    def win_indexes(self, n):
-        for r in range(n):
-            yield [(r, c) for c in range(n)]
-        for c in range(n):
-            yield [(r, c) for r in range(n)]
-        yield [(i, i) for i in range(n)]
-        yield [(i, n - 1 - i) for i in range(n)]
+    def legal_actions(self):
+        return LEGAL_ACTIONS[LEGAL[self.state]]
 
     def is_winner(self, decorator):
-        n = len(self.board)
-        for indexes in self.win_indexes(n):
-            if all(self.board[r][c] == decorator for r, c in indexes):
-                return True
-        return False
+        return WINNER[self.state] == decorator
 
     def is_draw(self):
-        for row in self.board:
-            if EMPTY in row:
-                return False
-        return True
+        return LEGAL[self.state] == 0
 
-    def print_board(self):
-        os.system("clear")
+    def print_board(self, clear=True):
+        if clear:
+            os.system("clear")
         for row in self.board:
             for item in row:
                 if item == X:
@@ -152,14 +146,103 @@ class Game:
             print()
 
 
+class BitboardGame:
+    # Same interface as Game, with X and O kept as two 9-bit integers
+    __slots__ = ("x", "o", "state", "status")
+
+    def __init__(self):
+        self.x = 0
+        self.o = 0
+        self.state = 0
+        self.status = GOING
+
+    def step(self, action, number):
+        action = int(action)
+        if not self.is_valid(action):
+            return INVALID
+
+        if number == X:
+            self.x |= 1 << action
+        else:
+            self.o |= 1 << action
+        self.state += number * 3 ** action
+
+        if self.is_winner(number):
+            self.status = WIN
+            return WIN
+        elif self.is_draw():
+            self.status = DRAW
+            return DRAW
+
+    def get_state(self):
+        return self.state
+
+    def is_valid(self, action):
+        return not (self.x | self.o) >> action & 1
+
+    def legal_actions(self):
+        return LEGAL_ACTIONS[~(self.x | self.o) & FULL_MASK]
+
+    def is_winner(self, decorator):
+        return HAS_LINE[self.x if decorator == X else self.o]
+
+    def is_draw(self):
+        return self.x | self.o == FULL_MASK
+
+    def print_board(self, clear=True):
+        if clear:
+            os.system("clear")
+        for row in range(3):
+            for col in range(3):
+                bit = 1 << (row * 3 + col)
+                if self.x & bit:
+                    print("X", end=" ")
+                elif self.o & bit:
+                    print("O", end=" ")
+                else:
+                    print("_", end=" ")
+            print()
+
+
+BOARDS = {"array": Game, "bitboard": BitboardGame}
+
+
 class Computer:
-    def __init__(self, number, q_table_path, alpha=0, gamma=0, epsilon=0):
+    def __init__(
+        self,
+        number,
+        q_table_path,
+        alpha=0,
+        gamma=0,
+        epsilon=0,
+        canonical=False,
+        compact=False,
+        dtype=np.float64,
+        learn_invalid=False,
+        q_table=None,
+        replay=None,
+        learner=None,
+    ):
+        # q_table is the empty store to start from when no table is saved,
+        # replay an optional replay.ReplayBuffer to learn through and learner
+        # an optional learners.Learner that learns from each finished game
+        self.empty_q_table = q_table
+        self.replay = replay
+        self.learner = learner
+        self.episode = []
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
+        self.learn_invalid = learn_invalid
+        self.canonical = canonical
+        self.compact = compact
+        self.dtype = dtype
 
-        self.q_table_path = q_table_path
-        self.q_table = self.load_q_table(q_table_path)
+        self.games = 0
+        self.moves = 0
+        self.invalid_moves = 0
+        self.q_table_path = storage.table_path(q_table_path)
+        self.q_table = self.load_q_table(self.q_table_path)
 
         self.last_action = None
         self.last_state = None
@@ -168,42 +251,107 @@ class Computer:
         self.number = number
 
     def load_q_table(self, path):
-        if os.path.exists(path):
-            with open(path, "rb") as f:
-                return pickle.load(f)
+        q_table, header = storage.load_q_table(path)
+        if q_table is not None:
+            self.check_board(q_table, path)
+            self.games = header.get("games", 0)
+            return q_table
+        elif self.empty_q_table is not None:
+            return self.empty_q_table
+        elif self.canonical:
+            return CanonicalQTable(self.dtype)
+        elif self.compact:
+            return CompactQTable(self.dtype)
         else:
-            return np.zeros((OBSERVATION_SPACE, ACTION_SPACE))
+            return np.zeros((OBSERVATION_SPACE, ACTION_SPACE), self.dtype)
+
+    def check_board(self, q_table, path):
+        # A saved table only fits the board its empty table is made for
+        empty = self.empty_q_table
+        cells = getattr(q_table, "action_space", ACTION_SPACE)
+        expected = getattr(empty, "action_space", ACTION_SPACE)
+        sparse = getattr(q_table, "layout", None) == "sparse"
+        if sparse != (getattr(empty, "layout", None) == "sparse") or (
+            cells != expected
+        ):
+            raise ValueError(
+                f"{path} was trained on a {cells}-cell board, "
+                f"not a {expected}-cell one"
+            )
 
     def save_q_table(self, path=None):
         if path is None:
             path = self.q_table_path
-        with open(path, "wb+") as f:
-            pickle.dump(self.q_table, f)
+        storage.save_q_table(
+            self.q_table,
+            path,
+            alpha=self.alpha,
+            gamma=self.gamma,
+            epsilon=self.epsilon,
+            games=self.games,
+        )
 
-    def reward(self, old_state, action, reward, new_state):
-        old_value = self.q_table[int(old_state), int(action)]
-        next_max = np.max(self.q_table[int(new_state)])
+    def reward(self, old_state, action, reward, new_state, done=False):
+        if self.learner is not None:
+            self.episode.append((old_state, action, reward, new_state))
+            if done:
+                self.learn_episode()
+            return
+        if self.replay is not None:
+            self.replay.add(old_state, action, reward, new_state, done)
+            self.replay.update(self)
+            return
+
+        old_value = self.q_table[old_state, action]
+        next_max = np.max(self.q_table[new_state])
 
         new_value = (1 - self.alpha) * old_value + self.alpha * (
             reward + self.gamma * next_max
         )
-        self.q_table[int(old_state), int(action)] = new_value
+        self.q_table[old_state, action] = new_value
+
+    def learn_episode(self):
+        states, actions, rewards, next_states = (
+            np.array([column]) for column in zip(*self.episode)
+        )
+        last = np.zeros(states.shape, dtype=bool)
+        last[0, -1] = True
+        self.learner.learn(
+            self,
+            states,
+            actions,
+            rewards,
+            next_states,
+            np.ones(states.shape, dtype=bool),
+            last,
+        )
+        self.episode = []
 
     def get_action(self, game, is_random=None):
         if is_random is None:
             is_random = random.uniform(0, 1) < self.epsilon
 
         state = game.get_state()
+        self.moves += 1
+
+        if not self.learn_invalid:
+            legal = game.legal_actions()
+            if is_random:
+                return legal[random.randrange(len(legal))]
+            return legal[np.argmax(self.q_table[state][legal])]
+
+        # Pick from every cell and learn INVALID_REWARD for occupied ones
+        while True:
+            if is_random:
+                # Larger grid boards have more cells than ACTION_SPACE
+                action = random.randrange(len(self.q_table[state]))
+            else:
+                action = np.argmax(self.q_table[state])
 
-        if is_random:
-            action = random.randrange(0, ACTION_SPACE)
-        else:
-            action = np.argmax(self.q_table[int(state)])
-
-        if not game.is_valid(action):
-            self.q_table[int(state), int(action)] = INVALID_REWARD
-            return self.get_action(game, is_random=is_random)
-        return action
+            if game.is_valid(action):
+                return action
+            self.q_table[state, action] = INVALID_REWARD
+            self.invalid_moves += 1
 
     def next_move(self, game):
         state = game.get_state()
@@ -216,6 +364,7 @@ class Computer:
                             self.last_action,
                             WIN_REWARD,
                             state,
+                            done=True,
                         )
                     else:
                         self.reward(
@@ -223,12 +372,20 @@ class Computer:
                             self.last_action,
                             LOSE_REWARD,
                             state,
+                            done=True,
                         )
                 elif game.status == DRAW:
                     self.reward(
-                        self.last_state, self.last_action, DRAW_REWARD, state
+                        self.last_state,
+                        self.last_action,
+                        DRAW_REWARD,
+                        state,
+                        done=True,
                     )
                 self.going = False
+                if self.learner is not None:
+                    # Don't carry this game's last move into the next one
+                    self.last_state = None
                 return
             else:
                 self.reward(
@@ -272,28 +429,195 @@ class Player:
         game.step(action, self.number)
 
 
-def train(p1, p2, loops):
-    game = Game()
+def train_players(
+    p1,
+    p2,
+    loops,
+    progress=True,
+    board="array",
+    monitor=None,
+    checkpoint=None,
+    seed=None,
+):
+    # board is a BOARDS name or a Game-like class, monitor a
+    # monitor.Monitor that may stop training early and checkpoint a
+    # checkpoint.Checkpoint that saves the run as it goes. seed seeds the
+    # random module, which picks the exploration moves.
+    if seed is not None:
+        random.seed(seed)
+    game = BOARDS.get(board, board)()
     p_list = [p1, p2]
+    if monitor is not None:
+        monitor.start(p_list)
+    if checkpoint is not None:
+        checkpoint.start(p_list)
 
-    with Bar("Training", max=loops) as bar:
+    with progress_bar("Training", loops, progress) as bar:
         for i in range(0, loops):
             if i % 333 == 0:
                 bar.next(333)
             game.__init__()
             p1.going = True
             p2.going = True
+            sampled = monitor is not None and monitor.sample()
+            if sampled:
+                monitor.instrument(p_list)
             while p1.going or p2.going:
                 for ai in p_list:
                     if ai.going:
                         ai.next_move(game)
 
-    for ai in p_list:
-        ai.save_q_table()
+            p1.games += 1
+            p2.games += 1
+            if checkpoint is not None:
+                checkpoint.update()
+            if monitor is not None:
+                if sampled:
+                    monitor.uninstrument(p_list)
+                winner = next(
+                    (ai.number for ai in p_list if game.is_winner(ai.number)),
+                    0,
+                )
+                if monitor.game_over(winner):
+                    break
+
+    save_players(p_list, monitor, checkpoint)
+
+
+def train(
+    games,
+    alpha=0.1,
+    gamma=0.8,
+    epsilon=0.1,
+    out=".",
+    engine="sequential",
+    progress=False,
+    canonical=False,
+    compact=False,
+    dtype=np.float64,
+    learn_invalid=False,
+    size=3,
+    win_length=3,
+    capacity=None,
+    bootstrap=False,
+    monitor=None,
+    learner=None,
+    checkpoint_games=None,
+    checkpoint_seconds=None,
+    resume=False,
+    replay_capacity=None,
+    replay_batch_size=32,
+    replay_eviction="fifo",
+    **options,
+):
+    # Trains both players and writes their tables to `out`. Extra options
+    # (batch_size, workers, ...) go to the batch/parallel engines; seed is
+    # taken by every engine.
+    # Boards other than 3x3 train sequentially on sparse Q-tables.
+    # bootstrap seeds new tables with the solver's perfect-play values.
+    # replay_capacity gives each player a replay buffer (sequential only).
+    # monitor is a monitor.Monitor (sequential and batch engines).
+    # learner names a learners.LEARNERS entry that learns from whole games
+    # (sequential and batch engines); without it the engines' own online
+    # Q-learning is used.
+    # checkpoint_games/checkpoint_seconds save the tables and RNG state to
+    # `out` during the run; resume continues the run checkpointed there.
+    os.makedirs(out, exist_ok=True)
+    seed = options.get("seed")
+    if "board" in options and engine != "sequential":
+        raise ValueError("Only the sequential engine takes a board")
+    grid = (size, win_length) != (3, 3)
+    if grid:
+        from grid import grid_game
+        from qtable import SparseQTable
+
+        if engine != "sequential" or bootstrap or replay_capacity or learner:
+            raise ValueError("Only 3x3 boards support this training mode")
+        options["board"] = grid_game(size, win_length)
+    if monitor is not None:
+        if engine == "parallel":
+            raise ValueError("The parallel engine can't be monitored")
+        options["monitor"] = monitor
+    if learner is not None:
+        from learners import LEARNERS
+
+        if engine == "parallel" or replay_capacity:
+            raise ValueError("Learners need the sequential or batch engine")
+        if learner == "double-q" and resume:
+            # Its two estimates are not checkpointed, only their mean
+            raise ValueError("Double Q runs can't be resumed")
+    if replay_capacity:
+        from replay import ReplayBuffer
+
+        if engine != "sequential":
+            raise ValueError("Replay buffers need the sequential engine")
+
+    p_list = [
+        Computer(
+            number,
+            os.path.join(out, path),
+            alpha=alpha,
+            gamma=gamma,
+            epsilon=epsilon,
+            canonical=canonical,
+            compact=compact,
+            dtype=dtype,
+            learn_invalid=learn_invalid,
+            q_table=(
+                SparseQTable(size * size, capacity, dtype) if grid else None
+            ),
+            replay=(
+                ReplayBuffer(
+                    replay_capacity,
+                    replay_batch_size,
+                    replay_eviction,
+                    seed,
+                )
+                if replay_capacity
+                else None
+            ),
+            learner=(
+                LEARNERS[learner](None if seed is None else [seed, number])
+                if learner is not None
+                else None
+            ),
+        )
+        for number, path in zip([X, O], table_names(size, win_length))
+    ]
+
+    if checkpoint_games or checkpoint_seconds or resume:
+        from checkpoint import Checkpoint
+
+        checkpoint = Checkpoint(
+            out, checkpoint_games, checkpoint_seconds, resume
+        )
+        games = checkpoint.remaining(p_list, games)
+        options["checkpoint"] = checkpoint
+
+    if bootstrap:
+        from solver import seed_q_table
+
+        for ai in p_list:
+            if ai.games == 0:
+                seed_q_table(ai.q_table, ai.number)
+
+    if engine == "sequential":
+        train_players(*p_list, games, progress=progress, **options)
+    elif engine == "batch":
+        from batch import batch_train
 
+        batch_train(*p_list, games, progress=progress, **options)
+    elif engine == "parallel":
+        from parallel import parallel_train
 
-def play(p1, p2):
-    game = Game()
+        parallel_train(*p_list, games, progress=progress, **options)
+    else:
+        raise ValueError(f"Unknown training engine {engine!r}")
+    return p_list
+
+
+def play(p1, p2, board="array"):
+    game = BOARDS[board]()
     p_list = [p1, p2]
 
     while p1.going or p2.going:
@@ -302,30 +626,52 @@ def play(p1, p2):
                 p.next_move(game)
 
 
-if __name__ == "__main__":
+def opponent(number, directory="."):
+    # Plays an exported policy when there is one at least as new as the
+    # Q-table, since it loads in a fraction of the time
+    from policy import C1_POLICY, C2_POLICY, PolicyComputer
+
+    table, policy = [(C1_TABLE, C1_POLICY), (C2_TABLE, C2_POLICY)][number - 1]
+    table = os.path.join(directory, table)
+    policy = os.path.join(directory, policy)
+    if os.path.exists(policy) and (
+        not os.path.exists(table)
+        or os.path.getmtime(policy) >= os.path.getmtime(table)
+    ):
+        return PolicyComputer(number, policy)
+    return Computer(number, table)
+
+
+def menu():
     print(
         color(
             255, 255, 255, "Q-Learning TicTacToe AI Created by CircuitSacul"
         )
     )
-    check = DefaultCheck(include=[0, 1, 2])
+    check = DefaultCheck(include=[0, 1, 2, 3])
     running = True
     while running:
         choice = safe_input(
-            prompt="0: Quit\n1: Play\n2: Train\n>",
+            prompt="0: Quit\n1: Play\n2: Train\n3: Batch Train\n>",
             in_type=int,
             check=check.check,
         )
         if choice == 2:
-            c1 = Computer(1, C1_TABLE, alpha=0.1, gamma=0.8, epsilon=0.1)
-            c2 = Computer(2, C2_TABLE, alpha=0.1, gamma=0.8, epsilon=0.1)
             train(
-                c1,
-                c2,
                 safe_input(
                     prompt="How many games? (Recommended is 10,000 or 100,000)\n>",
                     in_type=int,
                 ),
+                progress=True,
+            )
+        elif choice == 3:
+            train(
+                safe_input(
+                    prompt="How many games? (Recommended is 1,000,000)\n>",
+                    in_type=int,
+                ),
+                engine="batch",
+                progress=True,
             )
         elif choice == 1:
             is_p_first = (
@@ -335,11 +681,227 @@ if __name__ == "__main__":
             )
             if is_p_first:
                 p1 = Player(1)
-                p2 = Computer(2, C2_TABLE)
+                p2 = opponent(2)
             else:
                 p2 = Player(2)
-                p1 = Computer(1, C1_TABLE)
+                p1 = opponent(1)
             play(p1, p2)
         elif choice == 0:
             print("Exitting")
             running = False
+
+
+# Options of the train command that only some engines take
+ENGINE_OPTIONS = {
+    "batch_size": ("batch", "parallel"),
+    "workers": ("parallel",),
+    "sync_interval": ("parallel",),
+    "merge": ("parallel",),
+    "board": ("sequential",),
+    "replay_capacity": ("sequential",),
+    "learner": ("sequential", "batch"),
+    "stats": ("sequential", "batch"),
+    "log": ("sequential", "batch"),
+    "tolerance": ("sequential", "batch"),
+}
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Q-Learning TicTacToe AI. Run without a command for the "
+        "interactive menu."
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    train_parser = commands.add_parser("train", help="train without prompts")
+    train_parser.add_argument(
+        "--games", type=int, help="required unless resuming"
+    )
+    train_parser.add_argument("--alpha", type=float, default=0.1)
+    train_parser.add_argument("--gamma", type=float, default=0.8)
+    train_parser.add_argument("--epsilon", type=float, default=0.1)
+    train_parser.add_argument("--out", default=".")
+    train_parser.add_argument(
+        "--engine",
+        choices=["sequential", "batch", "parallel"],
+        default="sequential",
+    )
+    train_parser.add_argument("--progress", action="store_true")
+    train_parser.add_argument(
+        "--board", choices=list(BOARDS), help="sequential engine only"
+    )
+    train_parser.add_argument("--canonical", action="store_true")
+    train_parser.add_argument("--compact", action="store_true")
+    train_parser.add_argument(
+        "--dtype", choices=["float64", "float32", "float16"], default="float64"
+    )
+    train_parser.add_argument("--learn-invalid", action="store_true")
+    train_parser.add_argument(
+        "--bootstrap",
+        action="store_true",
+        help="seed new tables from the perfect-play solver",
+    )
+    train_parser.add_argument(
+        "--size", type=int, default=3, help="board size, at most 6"
+    )
+    train_parser.add_argument("--win-length", type=int)
+    train_parser.add_argument(
+        "--capacity", type=int, help="max rows kept by sparse Q-tables"
+    )
+    train_parser.add_argument(
+        "--replay-capacity",
+        type=int,
+        help="learn through a replay buffer of this many transitions",
+    )
+    train_parser.add_argument("--replay-batch-size", type=int, default=32)
+    train_parser.add_argument(
+        "--replay-eviction", choices=["fifo", "random"], default="fifo"
+    )
+    train_parser.add_argument(
+        "--learner",
+        choices=["q-learning", "sarsa", "double-q", "monte-carlo"],
+        help="learn from whole games with this algorithm instead of the "
+        "online Q-learning update",
+    )
+    train_parser.add_argument(
+        "--checkpoint-games",
+        type=int,
+        help="save the tables every this many games",
+    )
+    train_parser.add_argument(
+        "--checkpoint-seconds",
+        type=float,
+        help="save the tables every this many seconds",
+    )
+    train_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the run checkpointed in --out",
+    )
+    train_parser.add_argument(
+        "--stats", action="store_true", help="print metrics every epoch"
+    )
+    train_parser.add_argument(
+        "--log", help="write metrics every epoch to a .csv or .jsonl file"
+    )
+    train_parser.add_argument("--epoch-games", type=int, default=10000)
+    train_parser.add_argument(
+        "--tolerance",
+        type=float,
+        help="stop once mean |dQ| per epoch stays below this",
+    )
+    train_parser.add_argument("--patience", type=int, default=3)
+    train_parser.add_argument("--batch-size", type=int)
+    train_parser.add_argument("--seed", type=int)
+    train_parser.add_argument("--workers", type=int)
+    train_parser.add_argument("--sync-interval", type=int)
+    train_parser.add_argument("--merge", choices=["mean", "visits"])
+
+    export_parser = commands.add_parser(
+        "export", help="compile both Q-tables into greedy policies"
+    )
+    export_parser.add_argument(
+        "--dir", default=".", help="directory of the tables"
+    )
+    args = parser.parse_args(argv)
+    if args.command == "train":
+        if args.games is None and not args.resume:
+            parser.error("--games is required unless resuming")
+        for name, engines in ENGINE_OPTIONS.items():
+            given = getattr(args, name) not in (None, False)
+            if given and args.engine not in engines:
+                parser.error(
+                    f"--{name.replace('_', '-')} needs the "
+                    f"{' or '.join(engines)} engine"
+                )
+        if args.learner is not None and args.replay_capacity:
+            parser.error("--learner can't be combined with --replay-capacity")
+        if args.resume and args.learner == "double-q":
+            parser.error("--learner double-q runs can't be resumed")
+        if args.resume and args.games is None:
+            # With --games a missing checkpoint just starts a new run
+            from checkpoint import CHECKPOINT
+
+            if not os.path.exists(os.path.join(args.out, CHECKPOINT)):
+                parser.error(f"Nothing to resume in {args.out}")
+        if (args.size, args.win_length or args.size) != (3, 3) and (
+            args.engine != "sequential"
+            or args.bootstrap
+            or args.replay_capacity
+            or args.learner
+        ):
+            parser.error(
+                "boards other than 3x3 only train with the sequential engine "
+                "and without --bootstrap, --replay-capacity or --learner"
+            )
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command is None:
+        menu()
+    elif args.command == "export":
+        from policy import export_tables
+
+        try:
+            export_tables(args.dir)
+        except FileNotFoundError as error:
+            raise SystemExit(f"export: {error}")
+    elif args.command == "train":
+        # Engine options that were not given keep the engine's defaults
+        options = {
+            name: getattr(args, name)
+            for name in [
+                "batch_size",
+                "seed",
+                "workers",
+                "sync_interval",
+                "merge",
+                "board",
+            ]
+            if getattr(args, name) is not None
+        }
+        monitor = None
+        if args.stats or args.log or args.tolerance is not None:
+            from monitor import Monitor
+
+            monitor = Monitor(
+                args.epoch_games,
+                log=args.log,
+                verbose=args.stats,
+                tolerance=args.tolerance,
+                patience=args.patience,
+            )
+        train(
+            args.games,
+            alpha=args.alpha,
+            gamma=args.gamma,
+            epsilon=args.epsilon,
+            out=args.out,
+            engine=args.engine,
+            progress=args.progress,
+            canonical=args.canonical,
+            compact=args.compact,
+            dtype=np.dtype(args.dtype),
+            learn_invalid=args.learn_invalid,
+            size=args.size,
+            win_length=args.win_length or args.size,
+            capacity=args.capacity,
+            bootstrap=args.bootstrap,
+            monitor=monitor,
+            learner=args.learner,
+            checkpoint_games=args.checkpoint_games,
+            checkpoint_seconds=args.checkpoint_seconds,
+            resume=args.resume,
+            replay_capacity=args.replay_capacity,
+            replay_batch_size=args.replay_batch_size,
+            replay_eviction=args.replay_eviction,
+            **options,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Training instrumentation: per-epoch throughput, convergence and outcome
+# metrics plus sampled per-phase timings, sent to a callback, a CSV/JSONL
+# log and/or the terminal
+import csv
+import json
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+from states import O, X
+
+EPOCH_GAMES = 10000
+SAMPLE_EVERY = 100
+# Per-game phases are reported in microseconds, the rest in seconds
+PHASES = ("select", "learn", "game", "play")
+FIELDS = [
+    "epoch",
+    "games",
+    "seconds",
+    "games_per_sec",
+    "mean_abs_dq",
+    "invalid_rate",
+    "x_win_rate",
+    "o_win_rate",
+    "draw_rate",
+    *[f"{phase}_us" for phase in PHASES],
+    "save_seconds",
+]
+
+
+def snapshot(q_table):
+    if getattr(q_table, "layout", None) == "sparse":
+        return {key: row.copy() for key, row in q_table.rows.items()}
+    return np.array(getattr(q_table, "values", q_table))
+
+
+def abs_change(old, new):
+    # Sum of |new - old| and the number of values compared
+    if isinstance(new, dict):
+        total = sum(
+            np.abs(row - old.get(key, 0)).sum() for key, row in new.items()
+        )
+        return total, sum(row.size for row in new.values())
+    return np.abs(new - old).sum(), new.size
+
+
+class Monitor:
+    def __init__(
+        self,
+        epoch_games=EPOCH_GAMES,
+        callback=None,
+        log=None,
+        verbose=False,
+        sample_every=SAMPLE_EVERY,
+        tolerance=None,
+        patience=3,
+    ):
+        # tolerance stops training once mean |dQ| stays below it for
+        # `patience` epochs in a row
+        self.epoch_games = epoch_games
+        self.callback = callback
+        self.log = log
+        self.verbose = verbose
+        self.sample_every = sample_every
+        self.tolerance = tolerance
+        self.patience = patience
+        self.log_file = None
+        self.writer = None
+
+    def start(self, p_list):
+        self.p_list = p_list
+        self.epoch = 0
+        self.games = 0
+        self.calm = 0
+        self.records = []
+        if self.log is not None:
+            self.log_file = open(self.log, "w", newline="")
+            if self.log.endswith(".csv"):
+                self.writer = csv.DictWriter(self.log_file, FIELDS)
+                self.writer.writeheader()
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.outcomes = defaultdict(int)
+        self.epoch_played = 0
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.tables = [snapshot(ai.q_table) for ai in self.p_list]
+        self.moves = [(ai.moves, ai.invalid_moves) for ai in self.p_list]
+
+    @contextmanager
+    def timer(self, phase, games=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[phase] += time.perf_counter() - start
+            self.counts[phase] += games
+
+    def timed(self, phase, fn):
+        def wrapper(*args, **kwargs):
+            with self.timer(phase):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def sample(self):
+        return self.games % self.sample_every == 0
+
+    def instrument(self, p_list):
+        # Times one sequential game through instance attributes that shadow
+        # the Computer methods until uninstrument() removes them
+        for ai in p_list:
+            ai.next_move = self.timed("move", ai.next_move)
+            ai.get_action = self.timed("select", ai.get_action)
+            ai.reward = self.timed("learn", ai.reward)
+        for phase in ["move", "select", "learn"]:
+            self.counts[phase] += 1
+
+    def uninstrument(self, p_list):
+        for ai in p_list:
+            for name in ["next_move", "get_action", "reward"]:
+                vars(ai).pop(name, None)
+
+    def game_over(self, winner):
+        # Returns True once training should stop early
+        self.outcomes[winner] += 1
+        self.epoch_played += 1
+        self.games += 1
+        if self.epoch_played >= self.epoch_games:
+            return self.end_epoch()
+        return False
+
+    def games_over(self, winners):
+        for number in [0, X, O]:
+            self.outcomes[number] += int(np.count_nonzero(winners == number))
+        self.epoch_played += len(winners)
+        self.games += len(winners)
+        if self.epoch_played >= self.epoch_games:
+            return self.end_epoch()
+        return False
+
+    def phase_times(self):
+        times = dict(self.times)
+        if "move" in times:
+            # next_move time not spent choosing or learning is game logic
+            times["game"] = (
+                times.pop("move") - times["select"] - times["learn"]
+            )
+            self.counts["game"] = self.counts["move"]
+
+        fields = {}
+        for phase, seconds in times.items():
+            if phase in PHASES and self.counts[phase]:
+                fields[f"{phase}_us"] = 1e6 * seconds / self.counts[phase]
+            elif phase not in PHASES:
+                fields[f"{phase}_seconds"] = seconds
+        return fields
+
+    def end_epoch(self):
+        seconds = time.perf_counter() - self.started
+        played = self.epoch_played
+
+        total, count = 0.0, 0
+        for ai, old in zip(self.p_list, self.tables):
+            change, size = abs_change(old, snapshot(ai.q_table))
+            total += change
+            count += size
+        moves = sum(
+            ai.moves - m for ai, (m, _) in zip(self.p_list, self.moves)
+        )
+        invalid = sum(
+            ai.invalid_moves - i for ai, (_, i) in zip(self.p_list, self.moves)
+        )
+
+        self.epoch += 1
+        record = dict.fromkeys(FIELDS)
+        record.update(
+            epoch=self.epoch,
+            games=self.games,
+            seconds=seconds,
+            games_per_sec=played / seconds if played else None,
+            mean_abs_dq=float(total / count) if count else 0.0,
+            invalid_rate=invalid / moves if moves else 0.0,
+            x_win_rate=self.outcomes[X] / played if played else None,
+            o_win_rate=self.outcomes[O] / played if played else None,
+            draw_rate=self.outcomes[0] / played if played else None,
+            **self.phase_times(),
+        )
+        self.emit(record)
+
+        if (
+            self.tolerance is not None
+            and record["mean_abs_dq"] < self.tolerance
+        ):
+            self.calm += 1
+        else:
+            self.calm = 0
+        self.reset()
+        return self.calm >= self.patience
+
+    def emit(self, record):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+        if self.writer is not None:
+            self.writer.writerow(record)
+        elif self.log_file is not None:
+            self.log_file.write(json.dumps(record) + "\n")
+        if self.log_file is not None:
+            self.log_file.flush()
+        if self.verbose and "epoch" not in record:
+            print(f"saved in {record['save_seconds']:.3f}s", file=sys.stderr)
+        elif self.verbose:
+            print(
+                f"epoch {record['epoch']}: {record['games']} games, "
+                f"{record['games_per_sec'] or 0:,.0f} games/s, "
+                f"mean |dQ| {record['mean_abs_dq']:.2e}, "
+                f"invalid {record['invalid_rate']:.1%}, "
+                f"X/O/draw {record['x_win_rate'] or 0:.1%}/"
+                f"{record['o_win_rate'] or 0:.1%}/"
+                f"{record['draw_rate'] or 0:.1%}",
+                file=sys.stderr,
+            )
+
+    def finish(self):
+        # Flushes the last partial epoch, which the save timing goes into,
+        # then closes the log. When the run ended on an epoch boundary the
+        # save timing gets a record of its own, with no epoch or metrics
+        # that could be read as a converged one.
+        if self.epoch_played:
+            self.end_epoch()
+        elif self.times:
+            self.emit({"games": self.games, **self.phase_times()})
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+            self.writer = None
@@ -0,0 +1,166 @@
+# Multi-process self-play: shards of games run through the batch engine in
+# a worker pool and their Q-tables are merged every sync interval
+import os
+from multiprocessing import Pool, RawArray
+
+import numpy as np
+
+from batch import BATCH_SIZE, play_batch
+from training import progress_bar, save_players
+
+SYNC_INTERVAL = 50000
+MERGES = ("mean", "visits")
+
+# Tables shared by every worker of the pool when training in shared mode
+shared_values = []
+
+
+class Agent:
+    # The parts of a Computer the batch engine needs, cheap to send to workers
+    def __init__(self, ai):
+        self.number = ai.number
+        self.alpha = ai.alpha
+        self.gamma = ai.gamma
+        self.epsilon = ai.epsilon
+        self.learn_invalid = ai.learn_invalid
+        self.moves = 0
+        self.invalid_moves = 0
+        self.shared = False
+        self.visits = None
+
+        q_table = ai.q_table
+        self.store = None if isinstance(q_table, np.ndarray) else type(q_table)
+        self.bind(np.array(getattr(q_table, "values", q_table)))
+
+    def wrap(self, values):
+        return values if self.store is None else self.store(values=values)
+
+    def bind(self, values):
+        self.values = values
+        self.q_table = self.wrap(values)
+
+    def track_visits(self):
+        self.visit_counts = np.zeros(self.values.shape)
+        self.visits = self.wrap(self.visit_counts)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.shared:
+            # Workers attach to the shared table instead of receiving a copy
+            state.update(values=None, q_table=None)
+        return state
+
+
+def attach(buffers):
+    shared_values[:] = [
+        np.frombuffer(buffer, dtype).reshape(shape)
+        for buffer, dtype, shape in buffers
+    ]
+
+
+def share(agent):
+    values = agent.values
+    buffer = RawArray("b", values.nbytes)
+    view = np.frombuffer(buffer, values.dtype).reshape(values.shape)
+    view[...] = values
+    agent.bind(view)
+    agent.shared = True
+    return buffer, values.dtype, values.shape
+
+
+def play_shard(job):
+    agents, games, batch_size, seed = job
+    for i, agent in enumerate(agents):
+        if agent.shared:
+            agent.bind(shared_values[i])
+        else:
+            agent.track_visits()
+
+    rng = np.random.default_rng(seed)
+    while games > 0:
+        n = min(batch_size, games)
+        play_batch(*agents, n, rng)
+        games -= n
+
+    if agents[0].shared:
+        return None
+    return [(agent.values, agent.visit_counts) for agent in agents]
+
+
+def merge_values(results, merge):
+    values = np.stack([v for v, _ in results])
+    mean = values.mean(axis=0)
+    if merge == "mean":
+        return mean
+
+    visits = np.stack([c for _, c in results])
+    total = visits.sum(axis=0)
+    weighted = (values * visits).sum(axis=0) / np.maximum(total, 1)
+    # Cells no worker learned from (e.g. invalid-move penalties) fall back
+    # to the plain average
+    return np.where(total > 0, weighted, mean)
+
+
+def parallel_train(
+    p1,
+    p2,
+    loops,
+    workers=None,
+    sync_interval=SYNC_INTERVAL,
+    merge="mean",
+    shared=False,
+    batch_size=BATCH_SIZE,
+    seed=None,
+    progress=True,
+    checkpoint=None,
+):
+    if merge not in MERGES:
+        raise ValueError(f"merge must be one of {MERGES}")
+    if workers is None:
+        workers = os.cpu_count()
+
+    p_list = [p1, p2]
+    agents = [Agent(ai) for ai in p_list]
+    if shared:
+        pool = Pool(workers, attach, ([share(agent) for agent in agents],))
+    else:
+        pool = Pool(workers)
+    # Every shard gets its own child seed, so copy-mode runs are
+    # reproducible for a given seed and worker count
+    seeds = np.random.SeedSequence(seed)
+    if checkpoint is not None:
+        seeds = checkpoint.start(p_list, seeds)
+
+    def sync():
+        for ai, agent in zip(p_list, agents):
+            getattr(ai.q_table, "values", ai.q_table)[...] = agent.values
+
+    with pool, progress_bar("Training", loops, progress) as bar:
+        remaining = loops
+        while remaining > 0:
+            games = min(remaining, workers * sync_interval)
+            shards = [
+                games // workers + (i < games % workers)
+                for i in range(workers)
+            ]
+            jobs = [
+                (agents, n, batch_size, child)
+                for n, child in zip(shards, seeds.spawn(workers))
+                if n > 0
+            ]
+            results = pool.map(play_shard, jobs)
+
+            if not shared:
+                for i, agent in enumerate(agents):
+                    shard_results = [result[i] for result in results]
+                    agent.values[...] = merge_values(shard_results, merge)
+
+            remaining -= games
+            for ai in p_list:
+                ai.games += games
+            if checkpoint is not None:
+                checkpoint.update(seeds, sync)
+            bar.next(games)
+
+    sync()
+    save_players(p_list, checkpoint=checkpoint, rng=seeds)
@@ -0,0 +1,99 @@
+# Greedy policies compiled from Q-tables: the best legal action of every
+# state, so serving a move is a single array lookup
+import json
+import os
+
+import numpy as np
+
+from solver import PLAYABLE, TO_MOVE, greedy_actions
+from states import GOING, O, STATE_COUNT, TERMINAL, X
+from storage import (
+    C1_TABLE,
+    C2_TABLE,
+    header_path,
+    load_q_table,
+    read_header,
+    require_3x3,
+    require_table,
+    table_path,
+    write_atomic,
+)
+
+C1_POLICY = "c1_policy.npy"
+C2_POLICY = "c2_policy.npy"
+
+# Stored for states where no move can be made
+NO_ACTION = 255
+
+# An exported policy keeps one action for each state its player can face,
+# in this order
+POLICY_STATES = {
+    number: np.flatnonzero(PLAYABLE & (TO_MOVE == number)) for number in (X, O)
+}
+
+
+def compile_policy(q_table):
+    policy = np.full(STATE_COUNT, NO_ACTION, dtype=np.uint8)
+    states = np.flatnonzero(~TERMINAL)
+    policy[states] = greedy_actions(q_table, states)
+    return policy
+
+
+def export_policy(q_table, number, path, **header):
+    path = table_path(path)
+    actions = compile_policy(q_table)[POLICY_STATES[number]]
+    header.update(layout="policy", player=number, shape=list(actions.shape))
+
+    write_atomic(path, lambda f: np.save(f, actions))
+    write_atomic(
+        header_path(path), lambda f: f.write(json.dumps(header).encode())
+    )
+
+
+def load_policy(path):
+    # Reads an exported policy, or compiles one from a Q-table
+    path = table_path(path)
+    header = read_header(path)
+    if header["layout"] == "policy":
+        policy = np.full(STATE_COUNT, NO_ACTION, dtype=np.uint8)
+        policy[POLICY_STATES[header["player"]]] = np.load(path)
+        return policy
+
+    q_table, _ = load_q_table(path, mmap_mode="r")
+    if q_table is None:
+        raise FileNotFoundError(path)
+    return compile_policy(require_3x3(q_table, path))
+
+
+class PolicyComputer:
+    # Plays an exported policy wherever a Computer that doesn't learn would
+    def __init__(self, number, path):
+        self.number = number
+        self.policy = load_policy(path)
+        self.going = True
+
+    def get_action(self, game):
+        return int(self.policy[game.get_state()])
+
+    def next_move(self, game):
+        if game.status != GOING:
+            self.going = False
+            return
+        game.step(self.get_action(game), self.number)
+
+
+def export_tables(directory="."):
+    exports = [(X, C1_TABLE, C1_POLICY), (O, C2_TABLE, C2_POLICY)]
+    # Both tables are checked first, so no policy is written unless both are
+    for _, table, _ in exports:
+        require_table(os.path.join(directory, table))
+    for number, table, out in exports:
+        q_table, header = load_q_table(
+            os.path.join(directory, table), mmap_mode="r"
+        )
+        export_policy(
+            require_3x3(q_table, table),
+            number,
+            os.path.join(directory, out),
+            games=header.get("games", 0),
+        )
@@ -0,0 +1,137 @@
+# Q-table stores that can stand in for the dense ndarray in Computer
+from collections import OrderedDict
+
+import numpy as np
+
+from states import (
+    CANONICAL,
+    CANONICAL_CELL,
+    CELL_COUNT,
+    REACHABLE,
+    STATE_COUNT,
+)
+
+
+def row_index(states, codes=None):
+    # Stored states get rows 0..n-1 and every other code points at a shared
+    # scratch row n, so stray lookups cannot touch learned values
+    rows = np.full(STATE_COUNT, len(states), dtype=np.int32)
+    rows[states] = np.arange(len(states))
+    return rows if codes is None else rows[codes]
+
+
+REACHABLE_STATES = np.flatnonzero(REACHABLE)
+REACHABLE_ROWS = row_index(REACHABLE_STATES)
+
+CANONICAL_STATES = np.unique(CANONICAL[REACHABLE])
+CANONICAL_ROWS = row_index(CANONICAL_STATES, CANONICAL)
+
+
+class CompactQTable:
+    # Indexed like the dense table (q[state] and q[state, action]) but only
+    # keeps a row per reachable state, stored in the given dtype
+    layout = "compact"
+    rows = REACHABLE_ROWS
+    row_count = len(REACHABLE_STATES) + 1
+
+    def __init__(self, dtype=np.float64, values=None):
+        if values is None:
+            values = np.zeros((self.row_count, CELL_COUNT), dtype=dtype)
+        self.values = values
+
+    def locate(self, key):
+        if isinstance(key, tuple):
+            state, action = key
+            return self.rows[state], action
+        return self.rows[key]
+
+    def __getitem__(self, key):
+        return self.values[self.locate(key)]
+
+    def __setitem__(self, key, value):
+        self.values[self.locate(key)] = value
+
+
+class CanonicalQTable(CompactQTable):
+    # One row per symmetry class, kept in the cell order of the canonical
+    # board and permuted back to the caller's board on every lookup.
+    # Equivalent moves on a symmetric board share one cell of the row.
+    layout = "canonical"
+    rows = CANONICAL_ROWS
+    row_count = len(CANONICAL_STATES) + 1
+
+    def locate(self, key):
+        if isinstance(key, tuple):
+            state, action = key
+            return self.rows[state], CANONICAL_CELL[state, action]
+        return np.expand_dims(self.rows[key], -1), CANONICAL_CELL[key]
+
+
+class SparseQTable:
+    # Rows are created on first write and keyed by state code, for boards too
+    # big for a dense table. With a capacity, the least recently used rows
+    # are evicted once it is exceeded.
+    layout = "sparse"
+
+    def __init__(
+        self,
+        action_space=CELL_COUNT,
+        capacity=None,
+        dtype=np.float64,
+        values=None,
+        keys=None,
+    ):
+        if values is not None:
+            action_space = values.shape[1]
+            dtype = values.dtype
+        self.action_space = action_space
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.rows = OrderedDict()
+        if values is not None:
+            for key, row in zip(keys.tolist(), values):
+                self.rows[key] = np.array(row)
+
+        # Reads of unseen states share one zero row instead of allocating
+        self.empty_row = np.zeros(action_space, self.dtype)
+        self.empty_row.flags.writeable = False
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def values(self):
+        if not self.rows:
+            return np.zeros((0, self.action_space), self.dtype)
+        return np.array(list(self.rows.values()))
+
+    @property
+    def keys(self):
+        return np.array(list(self.rows), dtype=np.uint64)
+
+    def row(self, state, create=False):
+        state = int(state)
+        row = self.rows.get(state)
+        if row is None:
+            if not create:
+                return self.empty_row
+            row = np.zeros(self.action_space, self.dtype)
+            self.rows[state] = row
+            if self.capacity is not None and len(self.rows) > self.capacity:
+                self.rows.popitem(last=False)
+        elif self.capacity is not None:
+            self.rows.move_to_end(state)
+        return row
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            state, action = key
+            return self.row(state)[action]
+        return self.row(key)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, tuple):
+            state, action = key
+            self.row(state, create=True)[action] = value
+        else:
+            self.row(key, create=True)[...] = value
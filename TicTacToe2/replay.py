@@ -0,0 +1,89 @@
+# Experience replay for Computer: transitions are kept in a preallocated
+# structured ring array and replayed in vectorized minibatches
+import numpy as np
+
+from learners import td_update
+
+TRANSITION = np.dtype(
+    [
+        ("state", np.int64),
+        ("action", np.int64),
+        ("reward", np.float64),
+        ("next_state", np.int64),
+        ("done", np.bool_),
+    ]
+)
+EVICTIONS = ("fifo", "random")
+
+
+class ReplayBuffer:
+    def __init__(
+        self, capacity=10000, batch_size=32, eviction="fifo", seed=None
+    ):
+        if capacity < 1 or batch_size < 1:
+            raise ValueError("capacity and batch_size must be at least 1")
+        if eviction not in EVICTIONS:
+            raise ValueError(f"Unknown eviction {eviction!r}")
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.eviction = eviction
+        self.rng = np.random.default_rng(seed)
+
+        self.data = np.zeros(capacity, dtype=TRANSITION)
+        self.size = 0
+        self.head = 0
+        self.last = 0
+
+    def __len__(self):
+        return self.size
+
+    def get_state(self):
+        # Everything but the ring itself, which checkpoints save as an array
+        return {
+            "size": self.size,
+            "head": self.head,
+            "last": self.last,
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def set_state(self, state, data):
+        if len(data) != self.capacity:
+            raise ValueError(
+                f"Checkpointed replay buffer holds {len(data)} transitions, "
+                f"not {self.capacity}"
+            )
+        self.data[...] = data
+        self.size = state["size"]
+        self.head = state["head"]
+        self.last = state["last"]
+        self.rng.bit_generator.state = state["rng"]
+
+    def add(self, state, action, reward, next_state, done=False):
+        if self.size < self.capacity:
+            index = self.size
+            self.size += 1
+        elif self.eviction == "fifo":
+            index = self.head
+            self.head = (self.head + 1) % self.capacity
+        else:
+            index = self.rng.integers(self.capacity)
+
+        self.data[index] = (state, action, reward, next_state, done)
+        self.last = index
+
+    def sample(self):
+        # The newest transition plus batch_size - 1 random older ones, so a
+        # batch size of 1 is exactly the online update
+        index = self.rng.integers(self.size, size=self.batch_size)
+        index[0] = self.last
+        return self.data[index]
+
+    def update(self, ai):
+        batch = self.sample()
+        next_max = np.max(ai.q_table[batch["next_state"]], axis=1)
+        targets = batch["reward"] + np.where(
+            batch["done"], 0, ai.gamma * next_max
+        )
+        td_update(
+            ai.q_table, batch["state"], batch["action"], targets, ai.alpha
+        )
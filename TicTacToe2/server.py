@@ -0,0 +1,136 @@
+# Serves moves from trained Q-tables (or exported policies) over a JSON-lines
+# protocol on stdin/stdout. Each request is one line:
+#
+#   {"board": [0, 1, 0, 0, 2, 0, 0, 0, 0]}  or  {"state": 84}
+#   -> {"move": 0}
+#
+# Cells are 0 for empty, 1 for X and 2 for O; the player to move is worked
+# out from the board unless "player" is given. An "id" is echoed back, and
+# {"reload": true} reloads the tables at once. Tables are also reloaded
+# whenever a newer one is saved over them, without dropping requests; one
+# that fails to load is logged and its last good policy is served meanwhile.
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from policy import C1_POLICY, C2_POLICY, NO_ACTION, load_policy
+from solver import TO_MOVE
+from states import CELL_COUNT, O, POWERS, STATE_COUNT, X
+from storage import C1_TABLE, C2_TABLE, table_path
+
+CHECK_INTERVAL = 1.0
+
+
+class PolicyCache:
+    # One compiled policy per player, recompiled when its table changes
+    def __init__(self, paths, check_interval=CHECK_INTERVAL):
+        self.paths = {
+            number: table_path(path) for number, path in paths.items()
+        }
+        self.check_interval = check_interval
+        self.policies = {}
+        self.mtimes = {}
+        self.checked = 0
+        self.reload(force=True)
+
+    def reload(self, force=False):
+        # Returns False if a table failed to load. Its last good policy keeps
+        # being served and the load is retried at the next check.
+        loaded = True
+        for number, path in self.paths.items():
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if force or mtime != self.mtimes.get(number):
+                    # Swapped in only once loaded, so requests never wait on
+                    # a half-loaded table
+                    self.policies[number] = load_policy(path)
+                    self.mtimes[number] = mtime
+            except (OSError, EOFError, ValueError) as error:
+                if number not in self.policies:
+                    raise
+                print(f"Keeping the loaded {path}: {error}", file=sys.stderr)
+                loaded = False
+        self.checked = time.monotonic()
+        return loaded
+
+    def get(self, number):
+        if time.monotonic() - self.checked >= self.check_interval:
+            self.reload()
+        return self.policies[number]
+
+
+def parse_state(request):
+    if "board" in request:
+        board = request["board"]
+        if len(board) != CELL_COUNT or any(c not in (0, X, O) for c in board):
+            raise ValueError("board must be 9 cells of 0, 1 or 2")
+        return int(np.dot(board, POWERS))
+    state = int(request["state"])
+    if not 0 <= state < STATE_COUNT:
+        raise ValueError("state out of range")
+    return state
+
+
+def handle(cache, request):
+    if not isinstance(request, dict):
+        raise ValueError("requests must be JSON objects")
+    if request.get("reload"):
+        return {"reloaded": cache.reload(force=True)}
+
+    state = parse_state(request)
+    number = request.get("player", int(TO_MOVE[state]))
+    if number not in cache.paths:
+        raise ValueError("player must be 1 or 2")
+    move = int(cache.get(number)[state])
+    if move == NO_ACTION:
+        raise ValueError("the game is already over")
+    return {"move": move}
+
+
+def serve(cache, infile=sys.stdin, outfile=sys.stdout):
+    for line in infile:
+        if not line.strip():
+            continue
+        request = {}
+        try:
+            request = json.loads(line)
+            response = handle(cache, request)
+        except (KeyError, TypeError, ValueError) as error:
+            response = {"error": str(error)}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        outfile.write(json.dumps(response) + "\n")
+        outfile.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve TicTacToe moves as JSON lines on stdin/stdout"
+    )
+    parser.add_argument("--dir", default=".", help="directory of the tables")
+    parser.add_argument(
+        "--policies",
+        action="store_true",
+        help="serve the policies exported by 'main.py export'",
+    )
+    parser.add_argument(
+        "--check-interval",
+        type=float,
+        default=CHECK_INTERVAL,
+        help="seconds between checks for updated tables",
+    )
+    args = parser.parse_args()
+
+    paths = [C1_POLICY, C2_POLICY] if args.policies else [C1_TABLE, C2_TABLE]
+    cache = PolicyCache(
+        {
+            number: os.path.join(args.dir, path)
+            for number, path in zip([X, O], paths)
+        },
+        args.check_interval,
+    )
+    serve(cache)
@@ -0,0 +1,128 @@
+# Perfect-play values for every reachable position, used to score trained
+# Q-tables and to bootstrap new ones
+import argparse
+import os
+
+import numpy as np
+
+from states import (
+    CELL_COUNT,
+    CELLS,
+    EMPTY,
+    O,
+    POWERS,
+    REACHABLE,
+    STATE_COUNT,
+    TERMINAL,
+    WIN_REWARD,
+    WINNER,
+    X,
+)
+from storage import (
+    C1_TABLE,
+    C2_TABLE,
+    load_q_table,
+    require_3x3,
+    require_table,
+    write_atomic,
+)
+
+# Cached beside the module rather than in whatever directory it runs from
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+SOLVER_TABLE = os.path.join(CACHE_DIR, "solver_table.npz")
+
+# TO_MOVE[state] is the number of the player whose turn it is
+TO_MOVE = np.where(
+    (CELLS == X).sum(axis=1) == (CELLS == O).sum(axis=1), X, O
+).astype(np.int8)
+PLAYABLE = REACHABLE & ~TERMINAL
+
+
+def solve():
+    # Negamax by retrograde analysis: positions are solved from full boards
+    # back to the empty one, so every child is already in the table.
+    # value[state] is +1/0/-1 for the player to move; bit n of
+    # optimal[state] is set when playing cell n keeps that value.
+    value = np.zeros(STATE_COUNT, dtype=np.int8)
+    optimal = np.zeros(STATE_COUNT, dtype=np.uint16)
+    marks = (CELLS != EMPTY).sum(axis=1)
+
+    for level in range(CELL_COUNT, -1, -1):
+        states = np.flatnonzero(REACHABLE & (marks == level))
+        ended = states[TERMINAL[states]]
+        value[ended] = np.where(WINNER[ended] != 0, -1, 0)
+
+        states = states[~TERMINAL[states]]
+        if len(states) == 0:
+            continue
+        legal = CELLS[states] == EMPTY
+        children = states[:, None] + TO_MOVE[states, None] * POWERS
+        scores = np.where(legal, -value[np.where(legal, children, 0)], -2)
+        best = scores.max(axis=1)
+        value[states] = best
+        kept = scores == best[:, None]
+        optimal[states] = (kept << np.arange(CELL_COUNT)).sum(axis=1)
+
+    return value, optimal
+
+
+def load_solution(path=SOLVER_TABLE):
+    if os.path.exists(path):
+        with np.load(path) as solution:
+            return solution["value"], solution["optimal"]
+
+    value, optimal = solve()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_atomic(path, lambda f: np.savez(f, value=value, optimal=optimal))
+    return value, optimal
+
+
+def greedy_actions(q_table, states):
+    rows = q_table[states]
+    return np.argmax(np.where(CELLS[states] == EMPTY, rows, -np.inf), axis=1)
+
+
+def agreement(q_table, number, solution=None):
+    # Share of the positions `number` can face where the table's greedy move
+    # is a perfect-play move
+    if solution is None:
+        solution = load_solution()
+    _, optimal = solution
+
+    states = np.flatnonzero(PLAYABLE & (TO_MOVE == number))
+    actions = greedy_actions(q_table, states)
+    return float(np.mean(optimal[states] >> actions & 1))
+
+
+def seed_q_table(q_table, number, solution=None, scale=WIN_REWARD):
+    # Sets every legal move of `number` to scale times its perfect-play
+    # outcome, so the greedy policy starts out perfect
+    if solution is None:
+        solution = load_solution()
+    value, _ = solution
+
+    states = np.flatnonzero(PLAYABLE & (TO_MOVE == number))
+    rows, cells = np.nonzero(CELLS[states] == EMPTY)
+    states = states[rows]
+    children = states + number * POWERS[cells]
+    q_table[states, cells] = -scale * value[children].astype(float)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Score Q-tables against perfect play"
+    )
+    parser.add_argument("--dir", default=".", help="directory of the tables")
+    args = parser.parse_args()
+
+    solution = load_solution()
+    for number, path in [(X, C1_TABLE), (O, C2_TABLE)]:
+        table = os.path.join(args.dir, path)
+        try:
+            require_table(table)
+        except FileNotFoundError as error:
+            parser.error(str(error))
+        q_table, header = load_q_table(table, mmap_mode="r")
+        score = agreement(require_3x3(q_table, path), number, solution)
+        games = header.get("games", 0)
+        print(f"{path}: {score:.1%} optimal moves ({games} games)")
@@ -0,0 +1,122 @@
+# Lookup tables indexed by the base-3 state code from Game.get_state
+import numpy as np
+
+CELL_COUNT = 9
+STATE_COUNT = 3 ** CELL_COUNT
+
+# Shared by main.py and the training engines, which import them from here
+# rather than from the main script
+ACTION_SPACE = CELL_COUNT
+OBSERVATION_SPACE = STATE_COUNT
+
+# Rewards/Penalties
+WIN_REWARD = 10
+LOSE_REWARD = -10
+DRAW_REWARD = 0
+ACTION_REWARD = -1
+INVALID_REWARD = -20
+
+# Board Square States
+EMPTY = 0
+X = 1
+O = 2
+
+# Game States
+GOING = "going"
+WIN = "win"
+DRAW = "draw"
+
+# Action Types
+INVALID = "invalidAction"
+
+POWERS = 3 ** np.arange(CELL_COUNT)
+LINES = np.array(
+    [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6, 7, 8],
+        [0, 3, 6],
+        [1, 4, 7],
+        [2, 5, 8],
+        [0, 4, 8],
+        [2, 4, 6],
+    ]
+)
+# Bit n of a bitboard is cell n; a line is won when all its bits are set
+WIN_MASKS = tuple(int(sum(1 << cell for cell in line)) for line in LINES)
+FULL_MASK = (1 << CELL_COUNT) - 1
+# HAS_LINE[bitboard] is True when the marks in it contain a line
+HAS_LINE = tuple(
+    any(board & mask == mask for mask in WIN_MASKS)
+    for board in range(FULL_MASK + 1)
+)
+
+# CELLS[state] is the flattened board for a state code
+CELLS = (np.arange(STATE_COUNT)[:, None] // POWERS % 3).astype(np.int8)
+
+
+def find_winners(cells):
+    winner = np.zeros(len(cells), dtype=np.int8)
+    for number in (2, 1):
+        lines = cells[:, LINES]
+        winner[np.all(lines == number, axis=2).any(axis=1)] = number
+    return winner
+
+
+# WINNER[state] is the number of the player with three in a row, or 0
+WINNER = find_winners(CELLS)
+# LEGAL[state] has bit n set when cell n is empty
+LEGAL = ((CELLS == 0) << np.arange(CELL_COUNT)).sum(axis=1)
+LEGAL = LEGAL.astype(np.uint16)
+TERMINAL = (WINNER != 0) | (LEGAL == 0)
+# LEGAL_ACTIONS[mask] lists the empty cells of a LEGAL bitmask
+LEGAL_ACTIONS = [
+    np.flatnonzero(mask >> np.arange(CELL_COUNT) & 1)
+    for mask in range(2 ** CELL_COUNT)
+]
+
+
+def find_reachable():
+    reachable = np.zeros(STATE_COUNT, dtype=bool)
+    frontier = np.array([0])
+    for ply in range(CELL_COUNT + 1):
+        reachable[frontier] = True
+        frontier = frontier[~TERMINAL[frontier]]
+        boards, cells = np.nonzero(CELLS[frontier] == 0)
+        number = ply % 2 + 1
+        frontier = np.unique(frontier[boards] + number * POWERS[cells])
+    return reachable
+
+
+# Positions that can occur in a game where X (1) moves first
+REACHABLE = find_reachable()
+
+
+def find_symmetries():
+    grid = np.arange(CELL_COUNT).reshape(3, 3)
+    symmetries = []
+    for k in range(4):
+        rotated = np.rot90(grid, k)
+        symmetries.append(rotated.reshape(-1))
+        symmetries.append(np.fliplr(rotated).reshape(-1))
+    return np.array(symmetries)
+
+
+# Cell n of a board transformed by symmetry g is cell SYMMETRIES[g, n] of
+# the original board, and INVERSE[g] maps original cells to transformed ones
+SYMMETRIES = find_symmetries()
+INVERSE = np.argsort(SYMMETRIES, axis=1)
+
+# CANONICAL[state] is the smallest code among the eight symmetric boards and
+# TRANSFORM[state] the symmetry that produces it
+_transformed = CELLS[:, SYMMETRIES] @ POWERS
+TRANSFORM = np.argmin(_transformed, axis=1).astype(np.int8)
+CANONICAL = _transformed[np.arange(STATE_COUNT), TRANSFORM]
+# CANONICAL_CELL[state, action] is the cell of the canonical board that
+# action lands on. A canonical board that some symmetry maps to itself
+# (the empty board, say) is reached by several symmetries that send
+# equivalent moves to different cells, so each move takes the lowest one.
+CANONICAL_CELL = np.where(
+    (_transformed == CANONICAL[:, None])[:, :, None], INVERSE, CELL_COUNT
+).min(axis=1).astype(np.int8)
+del _transformed
@@ -0,0 +1,123 @@
+# Q-tables on disk: a raw .npy array with a small JSON header beside it
+import json
+import os
+import pickle
+
+import numpy as np
+
+from qtable import CanonicalQTable, CompactQTable, SparseQTable
+
+# Q-tables of the two players
+C1_TABLE = "c1_q_table.npy"
+C2_TABLE = "c2_q_table.npy"
+
+TABLE_EXT = ".npy"
+HEADER_EXT = ".json"
+KEYS_EXT = ".keys.npy"
+LEGACY_EXT = ".pickle"
+
+STORES = {
+    "compact": CompactQTable,
+    "canonical": CanonicalQTable,
+}
+
+
+def table_path(path):
+    return os.path.splitext(path)[0] + TABLE_EXT
+
+
+def header_path(path):
+    return os.path.splitext(path)[0] + HEADER_EXT
+
+
+def keys_path(path):
+    return os.path.splitext(path)[0] + KEYS_EXT
+
+
+def legacy_path(path):
+    return os.path.splitext(path)[0] + LEGACY_EXT
+
+
+def write_atomic(path, write):
+    # Readers that still have the old file mapped keep seeing it intact
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+        # On disk before the rename, or a crash could leave an empty file
+        # under the final name
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_q_table(q_table, path, **header):
+    path = table_path(path)
+    values = getattr(q_table, "values", q_table)
+    header.update(
+        layout=getattr(q_table, "layout", "dense"),
+        shape=list(values.shape),
+        dtype=values.dtype.str,
+    )
+
+    write_atomic(path, lambda f: np.save(f, values))
+    if header["layout"] == "sparse":
+        # Sparse tables store their state codes beside the rows
+        header["capacity"] = q_table.capacity
+        write_atomic(keys_path(path), lambda f: np.save(f, q_table.keys))
+    write_atomic(
+        header_path(path), lambda f: f.write(json.dumps(header).encode())
+    )
+
+
+def require_table(path):
+    # Computer silently starts from an empty table when none is saved, which
+    # is wrong wherever a trained one is expected
+    if not any(
+        os.path.exists(name(path)) for name in [table_path, legacy_path]
+    ):
+        raise FileNotFoundError(f"No Q-table at {table_path(path)}")
+
+
+def require_3x3(q_table, path):
+    # The solver, arena, policies and server only know the 3x3 board
+    if getattr(q_table, "layout", None) == "sparse":
+        raise ValueError(f"{path} is a table for a larger board, not 3x3")
+    return q_table
+
+
+def read_header(path):
+    path = header_path(path)
+    if not os.path.exists(path):
+        return {"layout": "dense"}
+    with open(path) as f:
+        return json.load(f)
+
+
+def convert_legacy(path):
+    with open(legacy_path(path), "rb") as f:
+        q_table = pickle.load(f)
+    save_q_table(q_table, path)
+
+
+def load_q_table(path, mmap_mode="c"):
+    # Copy-on-write maps share pages between every process reading the same
+    # table and only copy the pages a process writes to
+    path = table_path(path)
+    if not os.path.exists(path):
+        if not os.path.exists(legacy_path(path)):
+            return None, {}
+        convert_legacy(path)
+
+    header = read_header(path)
+    if header["layout"] == "sparse":
+        q_table = SparseQTable(
+            capacity=header.get("capacity"),
+            values=np.load(path),
+            keys=np.load(keys_path(path)),
+        )
+        return q_table, header
+
+    values = np.load(path, mmap_mode=mmap_mode)
+    store = STORES.get(header["layout"])
+    q_table = values if store is None else store(values=values)
+    return q_table, header
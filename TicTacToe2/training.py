@@ -0,0 +1,38 @@
+# Pieces shared by the sequential engine in main.py and the batch and
+# parallel engines, kept out of main.py so the engines never import the
+# main script
+from contextlib import nullcontext
+
+
+class NullBar:
+    # Stands in for progress.bar.Bar when training headless
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def next(self, n=1):
+        pass
+
+
+def progress_bar(title, total, enabled=True):
+    if not enabled:
+        return NullBar()
+    from progress.bar import Bar
+
+    return Bar(title, max=total)
+
+
+def save_players(p_list, monitor=None, checkpoint=None, rng=None):
+    timer = nullcontext() if monitor is None else monitor.timer("save")
+    with timer:
+        if checkpoint is None:
+            for ai in p_list:
+                ai.save_q_table()
+        else:
+            # The run is over (maybe stopped early): nothing left to resume
+            checkpoint.target = p_list[0].games
+            checkpoint.save(rng)
+    if monitor is not None:
+        monitor.finish()
@@ -0,0 +1,354 @@
+# Benchmarks for the TicTacToe training and inference hot paths
+#
+#   python benchmarks/run.py --out results.json
+#   python benchmarks/run.py --compare results.json
+#
+# Every benchmark reports operations per second (games, moves or calls) so
+# result files from different commits can be diffed with --compare. Every
+# timed run starts from seeded RNGs, and training runs from empty tables.
+import argparse
+import contextlib
+import copy
+import importlib.util
+import io
+import json
+import os
+import pickle
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TTT1_DIR = os.path.join(ROOT, "TicTacToe")
+TTT2_DIR = os.path.join(ROOT, "TicTacToe2")
+
+GAME_COUNTS = [1000, 10000]
+BATCH_GAME_COUNTS = [10000, 100000]
+CALLS = 100000
+REPEAT = 3
+SEED = 0
+TABLE_FILES = (".npy", ".json", ".pickle")
+
+benchmarks = []
+
+
+def benchmark(name, unit):
+    def decorator(fn):
+        benchmarks.append((name, unit, fn))
+        return fn
+
+    return decorator
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_ttt1():
+    return load_module("tictactoe1", os.path.join(TTT1_DIR, "main.py"))
+
+
+def load_ttt2():
+    # TicTacToe2 modules import each other by plain name
+    if TTT2_DIR not in sys.path:
+        sys.path.insert(0, TTT2_DIR)
+    import main
+
+    return main
+
+
+def seed_rngs(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def fresh_tables(seed=SEED):
+    # Removes the tables earlier runs saved in the working dir, so training
+    # starts from zero tables every time, and reseeds
+    for name in os.listdir("."):
+        if name.endswith(TABLE_FILES):
+            os.remove(name)
+    seed_rngs(seed)
+
+
+def measure(fn, ops, repeat, setup=None):
+    # Best of `repeat` runs; fn returns after doing `ops` operations. setup
+    # runs untimed before each of them.
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        with contextlib.redirect_stderr(io.StringIO()):
+            fn()
+        times.append(time.perf_counter() - start)
+    seconds = min(times)
+    return {"ops": ops, "seconds": seconds, "ops_per_sec": ops / seconds}
+
+
+def random_states(game_cls, n, seed=0):
+    # States seen in random play, for per-call benchmarks
+    rng = random.Random(seed)
+    games = []
+    while len(games) < n:
+        game = game_cls()
+        number = 1
+        while True:
+            legal = [a for a in range(9) if game.is_valid(a)]
+            if not legal:
+                break
+            games.append(copy.deepcopy(game))
+            game.step(rng.choice(legal), number)
+            if game.is_winner(number):
+                break
+            number = 3 - number
+    return games[:n]
+
+
+@benchmark("ttt1.train", "games")
+def bench_ttt1_train(repeat):
+    ttt1 = load_ttt1()
+    for games in GAME_COUNTS:
+        yield str(games), measure(
+            lambda: ttt1.train(games), games, repeat, setup=fresh_tables
+        )
+
+
+@benchmark("ttt1.get_action", "moves")
+def bench_ttt1_get_action(repeat):
+    ttt1 = load_ttt1()
+    games = random_states(ttt1.Game, CALLS)
+    fresh_tables()
+    computer = ttt1.Computer(ttt1.Game())
+
+    def run():
+        for game in games:
+            computer.get_action(game)
+
+    yield "", measure(run, len(games), repeat, setup=seed_rngs)
+
+
+def bench_game(game_cls, repeat):
+    games = random_states(game_cls, CALLS)
+
+    def get_state():
+        for game in games:
+            game.get_state()
+
+    def is_winner():
+        for game in games:
+            game.is_winner(1)
+
+    def is_valid():
+        for game in games:
+            game.is_valid(4)
+
+    yield "get_state", measure(get_state, len(games), repeat)
+    yield "is_winner", measure(is_winner, len(games), repeat)
+    yield "is_valid", measure(is_valid, len(games), repeat)
+
+
+@benchmark("ttt1.game", "calls")
+def bench_ttt1_game(repeat):
+    ttt1 = load_ttt1()
+    yield from bench_game(ttt1.Game, repeat)
+
+
+@benchmark("ttt1.bitboard_game", "calls")
+def bench_ttt1_bitboard_game(repeat):
+    ttt1 = load_ttt1()
+    yield from bench_game(ttt1.BitboardGame, repeat)
+
+
+@benchmark("ttt2.train", "games")
+def bench_ttt2_train(repeat):
+    ttt2 = load_ttt2()
+    for games in GAME_COUNTS:
+
+        def run():
+            p1 = ttt2.Computer(1, "c1.npy", alpha=0.1, gamma=0.8, epsilon=0.1)
+            p2 = ttt2.Computer(2, "c2.npy", alpha=0.1, gamma=0.8, epsilon=0.1)
+            ttt2.train_players(p1, p2, games, progress=False)
+
+        yield str(games), measure(run, games, repeat, setup=fresh_tables)
+
+
+@benchmark("ttt2.batch_train", "games")
+def bench_ttt2_batch_train(repeat):
+    ttt2 = load_ttt2()
+    from batch import batch_train
+
+    for games in BATCH_GAME_COUNTS:
+
+        def run():
+            p1 = ttt2.Computer(1, "c1.npy", alpha=0.1, gamma=0.8, epsilon=0.1)
+            p2 = ttt2.Computer(2, "c2.npy", alpha=0.1, gamma=0.8, epsilon=0.1)
+            batch_train(p1, p2, games, seed=SEED, progress=False)
+
+        yield str(games), measure(run, games, repeat, setup=fresh_tables)
+
+
+@benchmark("ttt2.learners", "games")
+def bench_ttt2_learners(repeat):
+    ttt2 = load_ttt2()
+    from batch import batch_train
+    from learners import LEARNERS
+
+    games = BATCH_GAME_COUNTS[0]
+    for name, learner in LEARNERS.items():
+
+        def run():
+            p_list = [
+                ttt2.Computer(
+                    number,
+                    f"c{number}.npy",
+                    alpha=0.1,
+                    gamma=0.8,
+                    epsilon=0.1,
+                    learner=learner(SEED),
+                )
+                for number in [1, 2]
+            ]
+            batch_train(*p_list, games, seed=SEED, progress=False)
+
+        yield name, measure(run, games, repeat, setup=fresh_tables)
+
+
+@benchmark("ttt2.get_action", "moves")
+def bench_ttt2_get_action(repeat):
+    ttt2 = load_ttt2()
+    games = random_states(ttt2.Game, CALLS)
+    fresh_tables()
+    computer = ttt2.Computer(1, "bench.npy")
+
+    def run():
+        for game in games:
+            computer.get_action(game)
+
+    yield "", measure(run, len(games), repeat, setup=seed_rngs)
+
+
+@benchmark("ttt2.game", "calls")
+def bench_ttt2_game(repeat):
+    ttt2 = load_ttt2()
+    yield from bench_game(ttt2.Game, repeat)
+
+
+@benchmark("ttt2.bitboard_game", "calls")
+def bench_ttt2_bitboard_game(repeat):
+    ttt2 = load_ttt2()
+    yield from bench_game(ttt2.BitboardGame, repeat)
+
+
+@benchmark("ttt2.load_q_table", "loads")
+def bench_ttt2_load(repeat):
+    ttt2 = load_ttt2()
+    q_table = np.random.default_rng(0).random(
+        (ttt2.OBSERVATION_SPACE, ttt2.ACTION_SPACE)
+    )
+    with open("legacy.pickle", "wb") as f:
+        pickle.dump(q_table, f)
+    ttt2.Computer(1, "table.npy").save_q_table()
+    loads = 100
+
+    def load_pickle():
+        for _ in range(loads):
+            with open("legacy.pickle", "rb") as f:
+                pickle.load(f)
+
+    def load_table():
+        for _ in range(loads):
+            ttt2.Computer(1, "table.npy")
+
+    yield "pickle", measure(load_pickle, loads, repeat)
+    yield "table", measure(load_table, loads, repeat)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(only=None, repeat=REPEAT):
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Benchmarks read and write Q-tables relative to the working dir
+        os.chdir(tmp)
+        try:
+            for name, unit, fn in benchmarks:
+                if only and not any(part in name for part in only):
+                    continue
+                for variant, result in fn(repeat):
+                    key = f"{name}[{variant}]" if variant else name
+                    results[key] = dict(result, unit=unit)
+                    print(
+                        f"{key:32} {result['ops_per_sec']:>14,.0f} {unit}/s",
+                        file=sys.stderr,
+                    )
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare(base, current):
+    print(f"{'benchmark':32} {'base':>14} {'current':>14} {'change':>8}")
+    for key, result in current["results"].items():
+        old = base["results"].get(key)
+        if old is None:
+            continue
+        ratio = result["ops_per_sec"] / old["ops_per_sec"]
+        print(
+            f"{key:32} {old['ops_per_sec']:>14,.0f} "
+            f"{result['ops_per_sec']:>14,.0f} {ratio:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the TicTacToe training and inference paths"
+    )
+    parser.add_argument("--out", help="write JSON results to this file")
+    parser.add_argument("--compare", help="JSON results to compare against")
+    parser.add_argument(
+        "--only", nargs="*", help="only run benchmarks matching these names"
+    )
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, args.repeat)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)